@@ -0,0 +1,64 @@
+"""Stand-in MCP server for the benchmarks.
+
+Serves over stdio when run as a script, or over HTTP (``sse`` or
+``streamable-http``) with ``--transport`` and ``--port``. The benchmarks also
+serve :data:`mcp` in-process with :func:`http_app`.
+
+Behaviour is set through environment variables:
+
+- ``FAKE_STARTUP_DELAY``: seconds to sleep before serving (default 0).
+- ``FAKE_TOOL_COUNT``: number of tools, named ``tool_0`` ... (default 5).
+- ``FAKE_LATENCY``: seconds each tool call takes (default 0).
+- ``FAKE_PAYLOAD_BYTES``: size of each tool result (default 100).
+- ``FAKE_FAILURE_RATE``: fraction of tool calls that fail (default 0).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from mcp.server.fastmcp import FastMCP
+
+
+STARTUP_DELAY = float(os.environ.get("FAKE_STARTUP_DELAY", "0"))
+TOOL_COUNT = int(os.environ.get("FAKE_TOOL_COUNT", "5"))
+LATENCY = float(os.environ.get("FAKE_LATENCY", "0"))
+PAYLOAD_BYTES = int(os.environ.get("FAKE_PAYLOAD_BYTES", "100"))
+FAILURE_RATE = float(os.environ.get("FAKE_FAILURE_RATE", "0"))
+
+mcp = FastMCP("benchmark")
+
+
+def _make_tool(index: int):
+    async def tool(text: str, repeat: int = 1) -> str:
+        await asyncio.sleep(LATENCY)
+        if random.random() < FAILURE_RATE:
+            raise RuntimeError(f"tool_{index} failed")
+        return (f"tool_{index}:{text}:" * repeat + "x" * PAYLOAD_BYTES)[:max(PAYLOAD_BYTES, 1)]
+
+    return tool
+
+
+for i in range(TOOL_COUNT):
+    mcp.add_tool(
+        _make_tool(i),
+        name=f"tool_{i}",
+        description=f"Benchmark tool number {i}. Returns a payload of {PAYLOAD_BYTES} bytes.",
+    )
+
+
+def http_app(transport: str):
+    """ASGI app serving the tools over ``sse`` or ``streamable-http``."""
+    return mcp.sse_app() if transport == "sse" else mcp.streamable_http_app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in MCP server.")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"], default="stdio")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    time.sleep(STARTUP_DELAY)
+    mcp.settings.port = args.port
+    mcp.run(transport=args.transport)
@@ -0,0 +1,276 @@
+"""Benchmarks of the MCP agent hot path.
+
+Starts stand-in MCP servers (``fake_server.py``) and drives
+``MCPChatParticipant.handle_chat_request`` with a stub chat model that
+requests a scripted number of tool calls per turn, then answers. Measures:
+
+- cold turn latency: first turn, servers started and no tool catalog cached,
+- warm turn latency: later turns on the running servers,
+- tool call throughput: tool calls per second over the warm turns,
+- concurrent chat scaling: wall time of 1, 2, 4 ... chats run at once,
+- memory: RSS and Python heap growth over the run.
+
+With ``--transport sse`` or ``--transport streamable-http`` one stand-in
+server is served in-process over HTTP and every configured server connects
+to it by ``url``, as notebooks do to a centrally run MCP server.
+
+Example::
+
+    python benchmarks/run_benchmarks.py --servers 2 --tools 20 --latency 0.05 --json results.json
+
+Caches are written to a temporary directory, so runs do not affect (or get
+sped up by) the user's tool catalog cache.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+os.environ["XDG_CACHE_HOME"] = tempfile.mkdtemp(prefix="nbi_mcp_agent_bench_")
+
+from notebook_intelligence import CancelToken, ChatRequest, ChatResponse  # noqa: E402
+
+from nbi_mcp_agent.extension import MCPChatParticipant  # noqa: E402
+
+
+class StubChatModel:
+    """Chat model that requests ``calls_per_turn`` tool calls, then answers.
+
+    Calls are spread round-robin over the advertised tools. ``model_latency``
+    seconds are spent on every completion to stand in for generation time.
+    """
+
+    def __init__(self, calls_per_turn: int, model_latency: float = 0.0) -> None:
+        self.calls_per_turn = calls_per_turn
+        self.model_latency = model_latency
+        self._next_tool = 0
+        self._lock = threading.Lock()
+
+    def completions(self, messages: list, tools: Optional[list] = None, response: Any = None,
+                    cancel_token: Any = None, options: dict = {}) -> Any:
+        time.sleep(self.model_latency)
+        if tools and messages[-1].get("role") != "tool" and self.calls_per_turn:
+            tool_calls = []
+            with self._lock:
+                for i in range(self.calls_per_turn):
+                    name = tools[self._next_tool % len(tools)]["function"]["name"]
+                    self._next_tool += 1
+                    tool_calls.append({
+                        "id": f"call_{i}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": json.dumps({"text": f"q{i}"})},
+                    })
+            message = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+        else:
+            message = {"role": "assistant", "content": "done"}
+
+        if response is not None:
+            response.stream({"choices": [{"delta": {"role": "assistant", **message}}]})
+            return None
+        return {"choices": [{"message": message}]}
+
+
+class StubHost:
+    def __init__(self, chat_model: StubChatModel) -> None:
+        self.chat_model = chat_model
+
+
+class CollectingResponse(ChatResponse):
+    """Chat response that keeps the streamed output."""
+
+    def __init__(self, chat_id: str) -> None:
+        super().__init__()
+        self.chatId = chat_id
+        self.output: list[Any] = []
+
+    @property
+    def message_id(self) -> str:
+        return self.chatId
+
+    def stream(self, data: Any, finish: bool = False) -> None:
+        self.output.append(data)
+
+    def finish(self) -> None:
+        pass
+
+
+def fake_server_env(args: argparse.Namespace) -> dict[str, str]:
+    return {
+        "FAKE_STARTUP_DELAY": str(args.startup_delay),
+        "FAKE_TOOL_COUNT": str(args.tools),
+        "FAKE_LATENCY": str(args.latency),
+        "FAKE_PAYLOAD_BYTES": str(args.payload_bytes),
+        "FAKE_FAILURE_RATE": str(args.failure_rate),
+    }
+
+
+def serve_http(args: argparse.Namespace) -> tuple[str, Any]:
+    """Serve a stand-in server in-process over HTTP. Returns its URL and the uvicorn server."""
+    import uvicorn
+
+    os.environ.update(fake_server_env(args))
+    sys.path.insert(0, BENCHMARK_DIR)
+    import fake_server
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        fake_server.http_app(args.transport), host="127.0.0.1", port=port, log_level="warning",
+    ))
+    threading.Thread(target=server.run, name="fake-mcp-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    path = "/sse" if args.transport == "sse" else "/mcp"
+    return f"http://127.0.0.1:{port}{path}", server
+
+
+def server_config(args: argparse.Namespace, url: Optional[str] = None) -> dict[str, Any]:
+    if url is None:
+        launch = {
+            "command": sys.executable,
+            "args": [os.path.join(BENCHMARK_DIR, "fake_server.py")],
+            "env": fake_server_env(args),
+        }
+    else:
+        launch = {"url": url, "transport": args.transport}
+    servers = {
+        f"bench{i}": {
+            **launch,
+            "max_concurrency": args.max_concurrency,
+            "pool_size": args.pool_size,
+        }
+        for i in range(args.servers)
+    }
+    return {"agent": {"stream_completions": args.stream}, "mcpServers": servers}
+
+
+def run_turn(participant: MCPChatParticipant, host: StubHost, chat_id: str) -> float:
+    """Run one chat turn on its own event loop, as Notebook Intelligence does, and time it."""
+    request = ChatRequest(
+        host=host, prompt="benchmark", chat_history=[{"role": "user", "content": "benchmark"}],
+        cancel_token=CancelToken(),
+    )
+    response = CollectingResponse(chat_id)
+    started = time.perf_counter()
+    asyncio.run(participant.handle_chat_request(request, response))
+    return time.perf_counter() - started
+
+
+def run_concurrent(participant: MCPChatParticipant, host: StubHost, chats: int) -> float:
+    threads = [
+        threading.Thread(target=run_turn, args=(participant, host, f"chat{i}")) for i in range(chats)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean": statistics.mean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    tracemalloc.start()
+    model = StubChatModel(args.calls_per_turn, args.model_latency)
+    host = StubHost(model)
+    participant = MCPChatParticipant(host)
+    url, http_server = serve_http(args) if args.transport != "stdio" else (None, None)
+    participant.client.server_config = server_config(args, url)
+    results: dict[str, Any] = {"config": vars(args)}
+    try:
+        results["cold_turn_s"] = run_turn(participant, host, "cold")
+
+        warm = [run_turn(participant, host, "warm") for _ in range(args.turns)]
+        results["warm_turn_s"] = summarize(warm)
+        results["tool_calls_per_s"] = args.calls_per_turn * len(warm) / sum(warm)
+
+        results["concurrent_chats_s"] = {
+            chats: run_concurrent(participant, host, chats) for chats in args.concurrency
+        }
+
+        _, peak = tracemalloc.get_traced_memory()
+        results["python_heap_peak_mb"] = peak / (1024 * 1024)
+        results["max_rss_mb"] = max_rss_mb()
+    finally:
+        participant.client.shutdown()
+        if http_server is not None:
+            http_server.should_exit = True
+        tracemalloc.stop()
+    return results
+
+
+def print_results(results: dict[str, Any]) -> None:
+    print(f"cold turn:          {results['cold_turn_s'] * 1000:9.1f} ms")
+    warm = results["warm_turn_s"]
+    print(
+        f"warm turn:          {warm['mean'] * 1000:9.1f} ms mean, {warm['p50'] * 1000:.1f} p50, "
+        f"{warm['p95'] * 1000:.1f} p95, {warm['max'] * 1000:.1f} max"
+    )
+    print(f"tool calls/s:       {results['tool_calls_per_s']:9.1f}")
+    for chats, elapsed in results["concurrent_chats_s"].items():
+        print(f"{chats:3d} concurrent chats: {elapsed * 1000:9.1f} ms")
+    print(f"python heap peak:   {results['python_heap_peak_mb']:9.1f} MB")
+    print(f"max RSS:            {results['max_rss_mb']:9.1f} MB")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--servers", type=int, default=2, help="number of stand-in servers")
+    parser.add_argument("--tools", type=int, default=10, help="tools per server")
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="server start-up delay in seconds")
+    parser.add_argument("--latency", type=float, default=0.01, help="tool call latency in seconds")
+    parser.add_argument("--payload-bytes", type=int, default=1000, help="size of each tool result")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of failing tool calls")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="max_concurrency of each server")
+    parser.add_argument("--pool-size", type=int, default=1, help="pool_size of each server")
+    parser.add_argument("--calls-per-turn", type=int, default=4, help="tool calls requested per turn")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="seconds per stub completion")
+    parser.add_argument("--turns", type=int, default=20, help="number of warm turns")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="numbers of concurrent chats to time")
+    parser.add_argument("--stream", action="store_true", help="enable stream_completions")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"], default="stdio",
+                        help="serve the stand-in server over stdio, or once in-process over HTTP")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    results = run(args)
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,3 +3,15 @@
 from .extension import MCPExtension
 
 __version__ = "0.1.0"
+
+
+def _jupyter_server_extension_points():
+    return [{"module": "nbi_mcp_agent"}]
+
+
+def _load_jupyter_server_extension(server_app):
+    """Register the metrics handler at ``/nbi-mcp-agent/metrics``."""
+    from .handlers import setup_handlers
+
+    setup_handlers(server_app.web_app)
+    server_app.log.info("Registered nbi_mcp_agent metrics handler at /nbi-mcp-agent/metrics")
@@ -0,0 +1,434 @@
+"""Iterative completion and tool calling loop of the MCP agent."""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Optional
+
+from notebook_intelligence import ChatRequest, ChatResponse, MarkdownData
+
+from nbi_mcp_agent.history import HistoryCompactor
+from nbi_mcp_agent.mcp_server import ToolCallCancelled
+from nbi_mcp_agent.metrics import CHAT_REQUEST_SECONDS, COMPLETION_SECONDS, timed
+from nbi_mcp_agent.streaming import StreamingCompletion
+from nbi_mcp_agent.tool_registry import RegisteredTool, ToolRegistry
+from nbi_mcp_agent.tool_results import READ_TOOL_RESULT, ToolResultLimiter, tool_result_to_text
+from nbi_mcp_agent.tool_selection import ToolSelector
+
+
+logging = logging.getLogger(__name__)
+
+
+class StopReason:
+    """Why an :class:`AgentLoop` stopped."""
+
+    COMPLETED = "completed"
+    MAX_ROUNDS = "max_rounds"
+    MAX_TOOL_CALLS = "max_tool_calls"
+    DEADLINE = "deadline"
+    REPEATED_TOOL_CALL = "repeated_tool_call"
+    CANCELLED = "cancelled"
+    ERROR = "error"
+
+
+_BUDGET_STOP_MESSAGES = {
+    StopReason.MAX_ROUNDS: "Stopped after {rounds} model rounds (`max_rounds`).",
+    StopReason.MAX_TOOL_CALLS: "Stopped after {tool_calls} tool calls (`max_tool_calls`).",
+    StopReason.DEADLINE: "Stopped after {elapsed:.0f}s (`max_duration`).",
+    StopReason.REPEATED_TOOL_CALL: "Stopped because the model repeated the same tool call (`max_repeated_tool_calls`).",
+}
+
+
+class _DeadlineExceeded(Exception):
+    """``max_duration`` passed while waiting for a completion or tool calls."""
+
+
+class PendingToolCall:
+    """A tool call requested by the model, resolved and checked before execution.
+
+    ``error`` is set when the call cannot be made; it is then sent back to
+    the model as the tool result instead of calling the tool.
+    """
+
+    __slots__ = ("tool_call", "tool", "args", "error")
+
+    def __init__(
+        self,
+        tool_call: dict,
+        tool: Optional[RegisteredTool],
+        args: dict[str, Any],
+        error: Optional[str] = None,
+    ) -> None:
+        self.tool_call: dict = tool_call
+        self.tool: Optional[RegisteredTool] = tool
+        self.args: dict[str, Any] = args
+        self.error: Optional[str] = error
+
+    @property
+    def name(self) -> str:
+        return self.tool_call['function']['name']
+
+
+class AgentLoop:
+    """Runs the completion and tool call rounds of one chat request.
+
+    Each round asks the model for a completion and executes the tool calls it
+    returns, until the model answers without tool calls or one of the budgets
+    in the agent settings is used up: ``max_rounds`` completions,
+    ``max_tool_calls`` tool calls, ``max_duration`` seconds, or the same call
+    with the same arguments requested more than ``max_repeated_tool_calls``
+    times. :attr:`stop_reason` tells which one ended the loop.
+
+    Tool results are passed through a :class:`ToolResultLimiter`; once a
+    result has been truncated the built-in ``read_tool_result`` tool is
+    offered so the model can page through the rest. With large catalogs a
+    :class:`ToolSelector` limits the tools sent to those relevant to the
+    conversation.
+
+    Before each round a :class:`HistoryCompactor` shrinks the messages to
+    ``history_max_tokens``, digesting and then dropping old tool results.
+
+    With ``stream_completions`` enabled completions are streamed: content is
+    shown as it is generated and each tool call starts as soon as its
+    arguments are complete, while the model is still generating.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        request: ChatRequest,
+        response: ChatResponse,
+        registry: ToolRegistry,
+        settings: dict[str, Any],
+        tool_choice: str = 'auto',
+    ) -> None:
+        self.client = client
+        self.request = request
+        self.response = response
+        self.registry = registry
+        self.settings = settings
+        self.messages: list[dict] = request.chat_history.copy()
+        self.options: dict[str, Any] = {'tool_choice': tool_choice}
+        self.rounds: int = 0
+        self.tool_call_count: int = 0
+        self.stop_reason: Optional[str] = None
+        self._started: float = time.monotonic()
+        self._call_counts: dict[tuple[str, str], int] = {}
+        self._round_calls: list[PendingToolCall] = []
+        self._round_tasks: list[asyncio.Future] = []
+        self._round_stop: Optional[str] = None
+        self.result_limiter = ToolResultLimiter(
+            client.result_store, settings["max_tool_result_chars"], settings["max_tool_results_chars"]
+        )
+        # Handles of results truncated in earlier prompts stay readable.
+        self.result_limiter.spilled = any(
+            READ_TOOL_RESULT.name in str(message.get('content', '')) for message in self.messages
+        )
+        self.compactor = HistoryCompactor(
+            client.result_store,
+            settings["history_max_tokens"],
+            settings["history_keep_rounds"],
+            settings["history_digest_chars"],
+        )
+        self._read_tool_result = RegisteredTool(READ_TOOL_RESULT.name, READ_TOOL_RESULT, None)
+        self.tool_selector = ToolSelector(registry, settings, self.messages, client.tool_selection_stats)
+
+    async def run(self) -> str:
+        """Run the loop to completion and return the stop reason."""
+        with timed(CHAT_REQUEST_SECONDS, "mcp_agent.chat_request") as labels:
+            try:
+                if len(self.registry) == 0:
+                    self.compactor.compact(self.messages)
+                    await self._until_deadline(self.completions(self.messages, tools=None, response=self.response))
+                    self.stop_reason = StopReason.COMPLETED
+                else:
+                    self.stop_reason = await self._run_rounds()
+            except _DeadlineExceeded:
+                # Tool calls the model streams from now on are not started.
+                self._round_stop = StopReason.DEADLINE
+                await self._cancel_round()
+                self.stop_reason = StopReason.DEADLINE
+            except Exception as e:
+                if self._cancel_requested():
+                    self.stop_reason = StopReason.CANCELLED
+                else:
+                    error_msg = f"Error calling tool: {str(e)}"
+                    logging.error(error_msg)
+                    logging.error(f"Stack trace:", exc_info=True)
+                    self.response.stream(MarkdownData(error_msg))
+                    self.stop_reason = StopReason.ERROR
+            labels["stop_reason"] = self.stop_reason
+
+        if self.stop_reason in _BUDGET_STOP_MESSAGES:
+            self.response.stream(MarkdownData(_BUDGET_STOP_MESSAGES[self.stop_reason].format(
+                rounds=self.rounds, tool_calls=self.tool_call_count, elapsed=self.elapsed
+            )))
+        logging.info(
+            f"Agent loop stopped ({self.stop_reason}) after {self.rounds} rounds, "
+            f"{self.tool_call_count} tool calls and {self.elapsed:.2f}s"
+        )
+        return self.stop_reason
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def _cancel_requested(self) -> bool:
+        cancel_token = self.request.cancel_token
+        return cancel_token is not None and cancel_token.is_cancel_requested
+
+    def _deadline_passed(self) -> bool:
+        return self.elapsed >= self.settings["max_duration"]
+
+    async def _until_deadline(self, awaitable: Any) -> Any:
+        """Await a completion or the tool calls of a round, raising :class:`_DeadlineExceeded` at ``max_duration``."""
+        try:
+            return await asyncio.wait_for(awaitable, max(self.settings["max_duration"] - self.elapsed, 0))
+        except asyncio.TimeoutError:
+            if not self._deadline_passed():
+                raise
+            raise _DeadlineExceeded() from None
+
+    async def _run_rounds(self) -> str:
+        while True:
+            if self._cancel_requested():
+                return StopReason.CANCELLED
+            if self.rounds >= self.settings["max_rounds"]:
+                return StopReason.MAX_ROUNDS
+            if self._deadline_passed():
+                return StopReason.DEADLINE
+
+            self.rounds += 1
+            self._start_round()
+            self.compactor.compact(self.messages)
+            if self.compactor.spilled:
+                self.result_limiter.spilled = True
+            stream = self.settings["stream_completions"]
+            if stream:
+                message = await self._stream_completion()
+            else:
+                tool_response = await self._until_deadline(
+                    self.completions(self.messages, self._tool_schemas(), options=self.options)
+                )
+                message = tool_response['choices'][0]['message']
+            if self._cancel_requested():
+                await self._cancel_round()
+                return StopReason.CANCELLED
+            # after first call, set tool_choice to auto
+            self.options['tool_choice'] = 'auto'
+
+            tool_calls = message.get('tool_calls', None) or []
+            if not stream and len(tool_calls) == 0 and message.get('content', None) is not None:
+                self.response.stream(MarkdownData(message['content']))
+            self.messages.append(message)
+
+            if len(tool_calls) == 0:
+                logging.debug("Tool call round completed")
+                return StopReason.COMPLETED
+
+            if not stream:
+                pending_calls = [self._prepare_tool_call(tool_call) for tool_call in tool_calls]
+                self._round_stop = self._check_budgets(pending_calls)
+                if self._round_stop is None:
+                    for pending_call in pending_calls:
+                        self._start_tool_call(pending_call)
+            self.tool_selector.add_used([message])
+
+            if self._round_stop is not None:
+                await self._cancel_round()
+                return self._round_stop
+
+            tool_results = await self._collect_tool_results()
+            for pending_call, content_text in zip(self._round_calls, tool_results):
+                function_call_result_message = {
+                    "role": "tool",
+                    "content": content_text,
+                    "tool_call_id": pending_call.tool_call['id']
+                }
+
+                self.messages.append(function_call_result_message)
+
+    async def _stream_completion(self) -> dict:
+        """Stream one completion, starting each tool call as soon as its arguments are complete."""
+        loop = asyncio.get_running_loop()
+
+        def _on_tool_call(tool_call: dict) -> None:
+            loop.call_soon_threadsafe(self._start_streamed_tool_call, tool_call)
+
+        completion = StreamingCompletion(self.response, _on_tool_call)
+        try:
+            await self._until_deadline(
+                self.completions(self.messages, self._tool_schemas(), response=completion, options=self.options)
+            )
+        except _DeadlineExceeded:
+            # The completion thread cannot be stopped; ignore what it still streams.
+            completion.detach()
+            raise
+        message = completion.close()
+        # Let the tool calls completed by close() start.
+        await asyncio.sleep(0)
+        return message
+
+    def _start_streamed_tool_call(self, tool_call: dict) -> None:
+        pending_call = self._prepare_tool_call(tool_call)
+        if self._round_stop is None:
+            self._round_stop = self._check_budgets([pending_call])
+        if self._round_stop is None:
+            self._start_tool_call(pending_call)
+
+    def _check_budgets(self, pending_calls: list[PendingToolCall]) -> Optional[str]:
+        """Return the stop reason if making these calls would exceed a budget."""
+        if self.tool_call_count + len(pending_calls) > self.settings["max_tool_calls"]:
+            return StopReason.MAX_TOOL_CALLS
+        if self._has_repeated_call(pending_calls):
+            return StopReason.REPEATED_TOOL_CALL
+        if self._deadline_passed():
+            return StopReason.DEADLINE
+        self.tool_call_count += len(pending_calls)
+        return None
+
+    def _tool_schemas(self) -> list[dict]:
+        schemas = self.tool_selector.schemas()
+        if self.result_limiter.spilled:
+            return schemas + [self._read_tool_result.schema]
+        return schemas
+
+    def _get_tool(self, name: str) -> Optional[RegisteredTool]:
+        if name == READ_TOOL_RESULT.name and self.result_limiter.spilled:
+            return self._read_tool_result
+        return self.registry.get(name)
+
+    def _prepare_tool_call(self, tool_call: dict) -> PendingToolCall:
+        """Resolve the tool of a tool call and validate its arguments.
+
+        Unknown tools and invalid arguments are turned into an error the
+        model gets as the tool result, so it can correct the call in the
+        next round.
+        """
+        if "id" not in tool_call:
+            tool_call['id'] = uuid.uuid4().hex
+
+        tool_name = tool_call['function']['name']
+        raw_args = tool_call['function'].get('arguments')
+        registered_tool = self._get_tool(tool_name)
+
+        if registered_tool is None:
+            logging.error(f"Tool not found: {tool_name}, args: {raw_args}")
+            return PendingToolCall(tool_call, None, {}, json.dumps({
+                "error": f"Unknown tool '{tool_name}'. Call one of the tools provided.",
+            }))
+
+        args, errors = registered_tool.validator.validate(raw_args)
+        if errors:
+            logging.warning(f"Invalid arguments for tool {tool_name}: {errors}")
+            self.response.stream(MarkdownData(f"Invalid arguments for tool {tool_name}, asking the model to fix them. "))
+            return PendingToolCall(tool_call, registered_tool, args, json.dumps({
+                "error": f"Invalid arguments for tool '{tool_name}'. Fix them and call the tool again.",
+                "details": errors,
+            }))
+
+        if registered_tool is not self._read_tool_result:
+            self.tool_selector.record_call(registered_tool.name)
+        return PendingToolCall(tool_call, registered_tool, args)
+
+    def _has_repeated_call(self, pending_calls: list[PendingToolCall]) -> bool:
+        """Count the calls and report whether one exceeds ``max_repeated_tool_calls``."""
+        repeated = False
+        for pending_call in pending_calls:
+            key = (pending_call.name, json.dumps(pending_call.args, sort_keys=True, default=str))
+            count = self._call_counts.get(key, 0) + 1
+            self._call_counts[key] = count
+            if count > self.settings["max_repeated_tool_calls"]:
+                logging.warning(f"Tool {pending_call.name} called {count} times with args {pending_call.args}")
+                repeated = True
+        return repeated
+
+    def _start_round(self) -> None:
+        self._round_calls: list[PendingToolCall] = []
+        self._round_tasks: list[asyncio.Future] = []
+        self._round_stop: Optional[str] = None
+        parallel = self.settings["parallel_tool_calls"]
+        self._call_limit = asyncio.Semaphore(self.settings["max_parallel_tool_calls"] if parallel else 1)
+
+    def _start_tool_call(self, pending_call: PendingToolCall) -> None:
+        """Start executing a tool call of the current round.
+
+        With ``parallel_tool_calls`` enabled the calls run concurrently, at most
+        ``max_parallel_tool_calls`` at a time; each server further limits the
+        calls it runs at once to its ``pool_size`` times ``max_concurrency``.
+        """
+        self._round_calls.append(pending_call)
+        self._round_tasks.append(asyncio.ensure_future(self._execute_tool_call(pending_call)))
+
+    async def _execute_tool_call(self, pending_call: PendingToolCall) -> Optional[str]:
+        """Execute one tool call and return its result text.
+
+        A call that times out or fails returns the error as its result so
+        the model can react, without affecting the other calls of the round;
+        calls cancelled by the user end the loop.
+        """
+        registered_tool, args = pending_call.tool, pending_call.args
+        if pending_call.error is not None:
+            return pending_call.error
+        if registered_tool is self._read_tool_result:
+            return None
+        async with self._call_limit:
+            self.response.stream(MarkdownData(f"Calling tool {registered_tool.name} "))
+            logging.info(f"Attempting to call tool {registered_tool.name} with args {args}")
+            try:
+                tool_call_response = await self.client.execute_tool(
+                    registered_tool.server, registered_tool.tool.name, args, cancel_token=self.request.cancel_token
+                )
+            except ToolCallCancelled as e:
+                if self._cancel_requested():
+                    raise
+                logging.warning(str(e))
+                return f"Error: {e}"
+            except Exception as e:
+                if self._cancel_requested():
+                    raise
+                logging.error(f"Tool {registered_tool.name} failed: {e!r}")
+                return f"Error: {e!r}"
+        if self.settings["parallel_tool_calls"] and len(self._round_tasks) > 1:
+            self.response.stream(MarkdownData(f"Tool {registered_tool.name} finished. "))
+        return tool_result_to_text(tool_call_response)
+
+    async def _collect_tool_results(self) -> list[str]:
+        """Wait for the tool calls of the round and return their results in call order.
+
+        Size limits are applied in call order once all calls are done. Calls
+        still running at ``max_duration`` are cancelled.
+        """
+        try:
+            results = await self._until_deadline(asyncio.gather(*self._round_tasks))
+        except BaseException:
+            await self._cancel_round()
+            raise
+
+        return [
+            self.result_limiter.read(call.args) if text is None else self.result_limiter.limit(text)
+            for call, text in zip(self._round_calls, results)
+        ]
+
+    async def _cancel_round(self) -> None:
+        for task in self._round_tasks:
+            task.cancel()
+        await asyncio.gather(*self._round_tasks, return_exceptions=True)
+
+    async def completions(self, messages: list, tools: Optional[list], response: Optional[ChatResponse] = None, options: dict = {}) -> Any:
+        """Run the synchronous chat model completion in a worker thread.
+
+        This keeps the request event loop free to stream progress, watch for
+        cancellation and service tool calls while the model is generating.
+        """
+        with timed(COMPLETION_SECONDS, "mcp_agent.completion", streamed=response is not None):
+            return await asyncio.to_thread(
+                self.request.host.chat_model.completions,
+                messages,
+                tools,
+                response=response,
+                cancel_token=self.request.cancel_token,
+                options=options.copy(),
+            )
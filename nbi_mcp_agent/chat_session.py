@@ -0,0 +1,48 @@
+"""Per-conversation state of the MCP chat participant."""
+
+import threading
+from collections import OrderedDict
+
+from notebook_intelligence import ChatResponse
+
+
+class ChatSession:
+    """State kept between the requests of one chat conversation."""
+
+    def __init__(self, chat_id: str) -> None:
+        self.chat_id: str = chat_id
+        # Set by /updateMCPConfig, the next message is then read as the config path.
+        self.awaiting_config_path: bool = False
+
+
+class ChatSessionStore:
+    """Thread-safe map from chat id to :class:`ChatSession`.
+
+    Notebook Intelligence handles each chat request on its own thread, so the
+    store is guarded by a lock. Only the ``max_sessions`` most recently used
+    sessions are kept.
+    """
+
+    # Key of requests whose response does not carry a chat id.
+    DEFAULT_CHAT_ID = "default"
+
+    def __init__(self, max_sessions: int = 256) -> None:
+        self.max_sessions: int = max_sessions
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def chat_id_of(cls, response: ChatResponse) -> str:
+        return getattr(response, "chatId", None) or cls.DEFAULT_CHAT_ID
+
+    def get(self, response: ChatResponse) -> ChatSession:
+        """Return the session of the conversation a response belongs to."""
+        chat_id = self.chat_id_of(response)
+        with self._lock:
+            session = self._sessions.get(chat_id)
+            if session is None:
+                session = self._sessions[chat_id] = ChatSession(chat_id)
+            self._sessions.move_to_end(chat_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
@@ -1,18 +1,32 @@
 """MCP Extension for Jupyter Notebook Intelligence."""
 
 import asyncio
+import atexit
+import concurrent.futures
+import json
 import logging
 import os
-import uuid
+import threading
+import time
 from typing import Any, List, Optional
 from mcp import ClientSession
-from nbi_mcp_agent.mcp_server import Configuration, Server, ToolWrapper
+from nbi_mcp_agent.agent_loop import AgentLoop
+from nbi_mcp_agent.chat_session import ChatSessionStore
+from nbi_mcp_agent.http_transport import HttpClientPool
+from nbi_mcp_agent.mcp_server import DEFAULT_STARTUP_TIMEOUT, Configuration, Server, ToolWrapper
+from nbi_mcp_agent.metrics import (
+    METRICS, RESULT_CACHE_REQUESTS, TOOL_ARGUMENTS_BYTES, TOOL_CALL_ERRORS, TOOL_CALL_SECONDS, TOOL_RESULT_BYTES, timed,
+)
+from nbi_mcp_agent.result_cache import ToolResultCache
+from nbi_mcp_agent.supervisor import ServerSupervisor
+from nbi_mcp_agent.tool_cache import ToolCatalogCache
+from nbi_mcp_agent.tool_registry import ToolRegistry
+from nbi_mcp_agent.tool_results import ToolResultStore, tool_result_size
+from nbi_mcp_agent.tool_selection import ToolSelectionStats
 from notebook_intelligence import (
     ChatCommand, MarkdownData, NotebookIntelligenceExtension, Host, 
-    ChatParticipant, ChatRequest, ChatResponse
+    ChatParticipant, ChatRequest, ChatResponse, CancelToken
 )
-from fuzzy_json import loads as fuzzy_json_loads
-from mcp.types import TextResourceContents
 from mcp import ClientSession
 from mcp.client.stdio import stdio_client
 
@@ -20,56 +34,355 @@ from mcp.client.stdio import stdio_client
 logging = logging.getLogger(__name__)
 
 class MCPClient:
-    def __init__(self):
+    """Pool of long-lived MCP server connections shared by all chat requests.
+
+    Notebook Intelligence runs every chat request on its own short-lived event
+    loop, so the servers are started on a dedicated pool loop thread and kept
+    running there until the config changes or the client is shut down.
+
+    Tool lists are persisted in a :class:`ToolCatalogCache`. A server with a
+    cached catalog is not started until one of its tools is called, and its
+    cache entry is refreshed in the background once it is running.
+
+    Notebook Intelligence has no deactivation hook, so the pool is shut down
+    by an ``atexit`` handler registered when the pool loop starts, or by an
+    explicit :meth:`shutdown`.
+
+    Started servers are watched by a :class:`ServerSupervisor`. Failed
+    servers are restarted with backoff, and the tools of a server whose
+    circuit breaker is open are left out of the catalog until it recovers.
+
+    Remote servers (entries with a ``url``) share the keep-alive HTTP
+    clients of :attr:`http_clients`, which live on the pool loop.
+    """
+
+    def __init__(self, tool_cache: Optional[ToolCatalogCache] = None):
         self.session: Optional[ClientSession] = None
         self.server_config = {}
         self.server_tool_dict = {}
+        self.registry = ToolRegistry()
         self._cleanup_lock = asyncio.Lock()
-        self.servers = []
-
-    async def initialize_servers(self):
-            
-        if self.server_config.get("mcpServers"):
-            self.servers = [
-                Server(name, srv_config)
-                for name, srv_config in self.server_config["mcpServers"].items()
-            ]
-
-        for server in self.servers:
+        self.servers: dict[str, Server] = {}
+        self.tool_cache = tool_cache or ToolCatalogCache()
+        self.result_cache = ToolResultCache()
+        self.result_store = ToolResultStore()
+        self.http_clients = HttpClientPool()
+        self.tool_selection_stats = ToolSelectionStats()
+        self._background_tasks: set[asyncio.Task] = set()
+        # Names of failed servers being started again in the background.
+        self._restarting: set[str] = set()
+        self.config_path: Optional[str] = None
+        self._config_stamp: Optional[tuple[int, int]] = None
+        self._config_watch_task: Optional[asyncio.Task] = None
+        self.supervisor = ServerSupervisor(lambda: list(self.servers.values()), on_restart=self._schedule_tool_refresh)
+        # Serializes server start-up and config changes on the pool loop.
+        self._config_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._config_lock = asyncio.Lock()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="mcp-server-pool", daemon=True
+                )
+                self._loop_thread.start()
+                atexit.register(self.shutdown)
+            return self._loop
+
+    async def _run_in_pool(self, coro) -> Any:
+        """Run a coroutine on the pool loop and await its result from the caller's loop."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+        return await asyncio.wrap_future(future)
+
+    async def initialize_servers(self) -> dict[str, tuple[float, Optional[Exception]]]:
+        """Start configured servers that are not running yet.
+
+        Servers start concurrently. Returns the startup time in seconds and the
+        error, if any, of every server started by this call.
+        """
+        return await self._run_in_pool(self._initialize_servers())
+
+    async def _initialize_servers(self) -> dict[str, tuple[float, Optional[Exception]]]:
+        async with self._config_lock:
+            return await self._start_servers()
+
+    async def _start_servers(self) -> dict[str, tuple[float, Optional[Exception]]]:
+        self.supervisor.start()
+        for name, srv_config in self.server_config.get("mcpServers", {}).items():
+            if name not in self.servers:
+                server = Server(name, srv_config, self.http_clients)
+                server.on_tools_changed = self._schedule_tool_refresh
+                self.servers[name] = server
+
+        async def _initialize(server: Server) -> tuple[float, Optional[Exception]]:
+            started = time.perf_counter()
             try:
                 await server.initialize()
+                error = None
             except Exception as e:
-                logging.error(f"Failed to initialize server: {e}")
+                logging.error(f"Failed to initialize server {server.name}: {e}")
+                error = e
+            return time.perf_counter() - started, error
+
+        # Only servers that were never started are waited for. Servers that
+        # failed are started again in the background once their backoff has
+        # passed, so a flapping server does not delay every request; their
+        # tools stay hidden until a start succeeds.
+        pending = [
+            server for server in self.servers.values()
+            if not server.supervised and self.tool_cache.get(server.config) is None
+        ]
+        for server in self.servers.values():
+            if (
+                server.supervised
+                and not server.is_alive
+                and server.breaker.retry_due
+                and server.name not in self._restarting
+            ):
+                self._restarting.add(server.name)
+                self._run_in_background(self._restart_server(server))
+
+        results = await asyncio.gather(*(_initialize(server) for server in pending))
+        return {server.name: result for server, result in zip(pending, results)}
+
+    async def _restart_server(self, server: Server) -> None:
+        """Start a failed server again, then refresh its tool catalog."""
+        try:
+            await server.initialize()
+        except Exception as e:
+            logging.warning(f"Restart of server {server.name} failed: {e}")
+            return
+        finally:
+            self._restarting.discard(server.name)
+        self._schedule_tool_refresh(server)
 
     async def all_tools(self) -> list[Any]:
         """List available tools from the server."""
+        return await self._run_in_pool(self._all_tools())
+
+    async def _all_tools(self) -> list[Any]:
+        async def _list_tools(server: Server) -> list[ToolWrapper]:
+            if not server.is_alive:
+                return self.tool_cache.get(server.config) or []
+            timeout = server.config.get("startup_timeout", DEFAULT_STARTUP_TIMEOUT)
+            try:
+                return await asyncio.wait_for(self._refresh_tools(server), timeout)
+            except Exception as e:
+                logging.error(f"Failed to list tools of server {server.name}: {e}")
+                return []
+
+        servers = [server for server in self.servers.values() if not server.breaker.is_open]
+        results = await asyncio.gather(*(_list_tools(server) for server in servers))
+
+        server_tool_dict = dict(zip(servers, results))
+        if (
+            server_tool_dict.keys() != self.server_tool_dict.keys()
+            or any(tools is not self.server_tool_dict[server] for server, tools in server_tool_dict.items())
+        ):
+            self.server_tool_dict = server_tool_dict
+            self.registry = ToolRegistry(server_tool_dict)
+
         all_tools : list[ToolWrapper] = []
-        for server in self.servers:
-            tools = await server.list_tools()
-            self.server_tool_dict[server] = tools
+        for tools in results:
             all_tools.extend(tools)
         return all_tools
+
+    async def _refresh_tools(self, server: Server) -> list[ToolWrapper]:
+        """List the tools of a running server and store them in the catalog cache."""
+        if server.tools is not None:
+            return server.tools
+        tools = await server.list_tools()
+        if self.tool_cache.set(server.name, server.config, tools):
+            logging.info(f"Updated cached tool catalog of server {server.name}")
+        return tools
+
+    def _schedule_tool_refresh(self, server: Server) -> None:
+        """Refresh the catalog of a server in the background (runs on the pool loop)."""
+        async def _refresh():
+            try:
+                await self._refresh_tools(server)
+            except Exception as e:
+                logging.warning(f"Failed to refresh tools of server {server.name}: {e}")
+
+        self._run_in_background(_refresh())
     
-    def convert_all_tools_to_schema(self, tools: List[ToolWrapper]):
-        tools_schema = []
-        for tool in tools:
-            tool_schema = tool.convert_tool_to_schema()
-            tools_schema.append(tool_schema)
-        return tools_schema
-    
-    def get_server_by_tool(self, tool: ToolWrapper) -> Server:
-        for server, tools in self.server_tool_dict.items():
-            if tool in tools:
-                return server
-        return None
+    async def execute_tool(
+        self, server: Server, tool_name: str, arguments: dict[str, Any], cancel_token: Optional[CancelToken] = None
+    ) -> Any:
+        """Execute a tool on one of the pooled servers, starting it if needed.
+
+        The call is cancelled when ``cancel_token`` is cancelled or after the
+        tool's timeout (``tool_timeouts``/``tool_timeout`` of the server,
+        else the ``tool_timeout`` agent setting).
+        """
+        return await self._run_in_pool(self._execute_tool(server, tool_name, arguments, cancel_token))
+
+    async def _execute_tool(
+        self, server: Server, tool_name: str, arguments: dict[str, Any], cancel_token: Optional[CancelToken] = None
+    ) -> Any:
+        ttl = ToolResultCache.ttl_for(server.config, tool_name)
+        if ttl is not None:
+            cache_key = ToolResultCache.make_key(server.name, tool_name, arguments)
+            result = self.result_cache.get(cache_key)
+            RESULT_CACHE_REQUESTS.inc(result="miss" if result is None else "hit")
+            if result is not None:
+                logging.info(f"Using cached result of tool {tool_name} on server {server.name}")
+                return result
+
+        if self.servers.get(server.name) is not server:
+            raise RuntimeError(f"Server {server.name} was removed by a config update")
+        TOOL_ARGUMENTS_BYTES.observe(len(json.dumps(arguments, default=str)), server=server.name, tool=tool_name)
+        with timed(TOOL_CALL_SECONDS, "mcp.tool.call", server=server.name, tool=tool_name):
+            try:
+                server.check_available()
+                if not server.is_alive:
+                    await server.initialize()
+                    self._schedule_tool_refresh(server)
+                timeout = server.tool_timeout(tool_name, Configuration.agent_settings(self.server_config)["tool_timeout"])
+                result = await server.execute_tool(tool_name, arguments, timeout=timeout, cancel_token=cancel_token)
+            except Exception as e:
+                TOOL_CALL_ERRORS.inc(server=server.name, tool=tool_name, error=type(e).__name__)
+                raise
+
+        TOOL_RESULT_BYTES.observe(tool_result_size(result), server=server.name, tool=tool_name)
+        if ttl is not None and not result.isError:
+            self.result_cache.put(cache_key, result, ttl, len(result.model_dump_json()))
+        return result
+
+    async def update_config(self, server_config: dict[str, Any]) -> None:
+        """Apply a new config, restarting only the servers whose entry changed."""
+        await self._run_in_pool(self._update_config(server_config))
+
+    async def _update_config(self, server_config: dict[str, Any]) -> None:
+        """Swap in a new config.
+
+        Servers whose entry was removed or changed are taken out of the pool
+        at once and stopped in the background once their in-flight calls
+        finish (at most ``drain_timeout`` seconds). Unchanged servers keep
+        running with their tool lists; changed ones start again on demand.
+        """
+        async with self._config_lock:
+            old_settings = Configuration.agent_settings(self.server_config)
+            agent_settings = Configuration.agent_settings(server_config)
+            new_servers = server_config.get("mcpServers", {})
+
+            stale = [
+                server for name, server in self.servers.items()
+                if new_servers.get(name) != server.config
+            ]
+            for server in stale:
+                del self.servers[server.name]
+                self.result_cache.discard_server(server.name)
+                self._run_in_background(server.drain(agent_settings["drain_timeout"]))
+            if stale:
+                logging.info(f"Config update stops servers: {', '.join(server.name for server in stale)}")
+
+            if (
+                agent_settings["result_cache_max_entries"] != old_settings["result_cache_max_entries"]
+                or agent_settings["result_cache_max_bytes"] != old_settings["result_cache_max_bytes"]
+            ):
+                self.result_cache = ToolResultCache(
+                    agent_settings["result_cache_max_entries"], agent_settings["result_cache_max_bytes"]
+                )
+            await self.supervisor.set_interval(agent_settings["health_check_interval"])
+            self.server_config = server_config
+
+    def watch_config(self, path: str) -> concurrent.futures.Future:
+        """Load the config file at ``path`` and apply its changes from then on.
+
+        The file is polled every ``config_poll_interval`` seconds (agent
+        setting; 0 loads it once without watching) and changes are applied
+        with :meth:`update_config`. A missing file means no servers; a file
+        that is not valid JSON is ignored until fixed. Returns a future that completes once the file
+        was loaded the first time.
+        """
+        return asyncio.run_coroutine_threadsafe(self._watch_config(path), self._get_loop())
+
+    async def _watch_config(self, path: str) -> None:
+        if self._config_watch_task is not None:
+            self._config_watch_task.cancel()
+        self.config_path = path
+        self._config_stamp = None
+        await self._reload_config_file()
+        self._config_watch_task = asyncio.create_task(self._poll_config_file(), name="mcp-config-watch")
+
+    async def _poll_config_file(self) -> None:
+        while True:
+            interval = Configuration.agent_settings(self.server_config)["config_poll_interval"]
+            if interval <= 0:
+                logging.info(f"Stopped watching MCP config {self.config_path} (config_poll_interval is {interval})")
+                return
+            await asyncio.sleep(interval)
+            try:
+                await self._reload_config_file()
+            except Exception as e:
+                logging.warning(f"Failed to reload MCP config {self.config_path}: {e}")
+
+    async def _reload_config_file(self) -> None:
+        """Apply the watched config file if its modification time or size changed."""
+        try:
+            stat = os.stat(self.config_path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._config_stamp:
+            return
+        self._config_stamp = stamp
+
+        if stamp is None:
+            server_config = {}
+        else:
+            try:
+                server_config = Configuration.load_config(self.config_path)
+            except ValueError as e:
+                logging.error(f"Ignoring invalid MCP config {self.config_path}: {e}")
+                return
+        logging.info(f"Loading MCP config {self.config_path}")
+        await self._update_config(server_config)
+
+    def _run_in_background(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
     async def cleanup_servers(self) -> None:
         """Clean up all servers properly."""
-        for server in reversed(self.servers):
+        if self._loop is None:
+            return
+        await self._run_in_pool(self._cleanup_servers())
+
+    async def _cleanup_servers(self) -> None:
+        await self.supervisor.stop()
+        if self._config_watch_task is not None:
+            self._config_watch_task.cancel()
+            self._config_watch_task = None
+        for server in reversed(list(self.servers.values())):
             try:
-                await server.cleanup()
+                await server.close()
             except Exception as e:
-                logging.warning(f"Warning during final cleanup: {e}")    
+                logging.warning(f"Warning during final cleanup: {e}")
+        await self.http_clients.aclose()
+        self.servers = {}
+        self.server_tool_dict = {}
+        self.registry = ToolRegistry()
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop all servers and the pool loop. Safe to call more than once."""
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop, self._loop_thread = None, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._cleanup_servers(), loop).result(timeout)
+        except Exception as e:
+            logging.warning(f"Warning during server pool shutdown: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
 
 
 class MCPChatParticipant(ChatParticipant):
@@ -79,20 +392,11 @@ class MCPChatParticipant(ChatParticipant):
         super().__init__()
         self.host = host
         self.client = None
-        self.updation_in_progress = False
+        self.sessions = ChatSessionStore()
         self.initialize_client()
 
     def initialize_client(self):
         self.client = MCPClient()
-        self.tools_list: list[ToolWrapper] = []
-        self.tools_schema_list = []
-
-
-    def cleanup_server_tools(self):
-        self.client.servers = []
-        self.tools_list: list[ToolWrapper] = []
-        self.tools_schema_list = []
-        self.client.server_tool_dict = {}
 
 
     def is_client_initialized(self) -> bool:
@@ -119,27 +423,53 @@ class MCPChatParticipant(ChatParticipant):
         return [
             ChatCommand(name='help', description='Show help'),
             ChatCommand(name='getMCPConfig', description='Get MCP Config'),
-            ChatCommand(name='updateMCPConfig', description='Update MCP Config')
+            ChatCommand(name='updateMCPConfig', description='Update MCP Config'),
+            ChatCommand(name='stats', description='Show MCP Agent timings and counters')
         ]
     
-    def _get_tool_schema_by_name(self, name: str) -> dict:
-        for tool in self.tools_schema_list:
-            if tool["function"]["name"] == name:
-                return tool
-        return None
-    
-    def _get_tool_by_name(self, name: str) -> dict:
-        for tool in self.tools_list:
-            if tool.name == name:
-                return tool
-        return None
     
 
+    def _format_startup_report(self, startup_report: dict[str, tuple[float, Optional[Exception]]]) -> str:
+        lines = []
+        for name, (elapsed, error) in startup_report.items():
+            if error is None:
+                lines.append(f"- `{name}` started in {elapsed:.2f}s")
+            elif isinstance(error, asyncio.TimeoutError):
+                lines.append(f"- `{name}` failed to start: timed out after {elapsed:.2f}s")
+            else:
+                lines.append(f"- `{name}` failed to start after {elapsed:.2f}s: {error}")
+        return "MCP servers:\n" + "\n".join(lines) + "\n\n"
+
+    def _format_stats(self) -> str:
+        lines = ["| Metric | Labels | Count | Mean | Max |", "|---|---|---|---|---|"]
+        counter_lines = ["| Counter | Labels | Value |", "|---|---|---|"]
+        for metric in METRICS.metrics():
+            for labels, value in metric.samples():
+                label_text = ", ".join(f"{k}={v}" for k, v in sorted(labels.items()))
+                if metric.kind == "histogram":
+                    lines.append(
+                        f"| {metric.name} | {label_text} | {value['count']} | {value['mean']:.3f} | {value['max']:.3f} |"
+                    )
+                else:
+                    counter_lines.append(f"| {metric.name} | {label_text} | {value:g} |")
+        cache_stats = self.client.result_cache.stats()
+        selection_stats = self.client.tool_selection_stats.stats()
+        return (
+            "MCP Agent stats (durations in seconds, sizes in bytes):\n\n"
+            + "\n".join(lines) + "\n\n"
+            + "\n".join(counter_lines) + "\n\n"
+            + "Result cache: " + ", ".join(f"{k}={v}" for k, v in cache_stats.items()) + "\n\n"
+            + "Tool selection: " + ", ".join(
+                f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in selection_stats.items()
+            ) + "\n"
+        )
+
     async def handle_chat_request(self, request: ChatRequest, response: ChatResponse, options: dict = {}) -> None:
         try:
-            if self.updation_in_progress:
+            session = self.sessions.get(response)
+            if session.awaiting_config_path:
 
-                self.updation_in_progress = False
+                session.awaiting_config_path = False
                 new_config_path = request.chat_history[-1].get('content', '')
                 new_config_path = new_config_path.replace('@mcp-agent ', '', 1)
                 new_config_path = new_config_path.strip()
@@ -147,7 +477,7 @@ class MCPChatParticipant(ChatParticipant):
                 response.stream(MarkdownData(f"Updating MCP config to: {new_config_path}"))
 
                 if os.path.isfile(new_config_path) and new_config_path.endswith('.json'):
-                    self.client.server_config = Configuration.load_config(new_config_path)
+                    await asyncio.wrap_future(self.client.watch_config(new_config_path))
                     response.stream(MarkdownData(f"Updated MCP config to: {self.client.server_config}"))
                     
                 else:
@@ -163,20 +493,27 @@ class MCPChatParticipant(ChatParticipant):
                 \n```text\n@mcp-agent prompt"\n```\n
                 \n```text\n@mcp-agent getMCPConfig"\n```\n
                 \n```text\n@mcp-agent updateMCPConfig"\n```\n
+                \n```text\n@mcp-agent stats"\n```\n
                 """))
-                response.stream(MarkdownData(f"Available tools: {self.tools_list}"))
+                response.stream(MarkdownData(f"Available tools: {', '.join(self.client.registry.names())}"))
                 response.finish()
                 return
             
             if request.command == 'getMCPConfig':
                 response.stream(MarkdownData("""Listing the MCP server config:\n
                 """))
+                response.stream(MarkdownData(f"Config file: {self.client.config_path}\n\n"))
                 response.stream(MarkdownData(f"{self.client.server_config}"))
                 response.finish()
                 return
             
+            if request.command == 'stats':
+                response.stream(MarkdownData(self._format_stats()))
+                response.finish()
+                return
+
             if request.command == 'updateMCPConfig':
-                self.updation_in_progress = True
+                session.awaiting_config_path = True
                 response.stream(MarkdownData(f"Provide Absolute path to the new MCP config file:"))
                 response.finish()
                 return
@@ -200,127 +537,16 @@ class MCPChatParticipant(ChatParticipant):
     async def handle_chat_request_with_mcp_tools(self, request: ChatRequest, response: ChatResponse, options: dict = {}, tool_context: dict = {}, tool_choice = 'auto') -> None:
         try:
 
-            await self.client.initialize_servers()
-            self.tools_list = await self.client.all_tools()
-            self.tools_schema_list = self.client.convert_all_tools_to_schema(self.tools_list)
-            tools = self.tools_schema_list
-            messages = request.chat_history.copy()
-
-            if len(tools) == 0:
-                request.host.chat_model.completions(messages, tools=None, cancel_token=request.cancel_token, response=response)
-                return
-
-            openai_tools = tools
-            tool_call_rounds = []
-            # TODO overrides options arg
-            options = {'tool_choice': tool_choice}
-
-            async def _tool_call_loop(tool_call_rounds: list):
-                try:
-                    tool_response = request.host.chat_model.completions(messages, openai_tools, cancel_token=request.cancel_token, options=options)
-                    # after first call, set tool_choice to auto
-                    options['tool_choice'] = 'auto'
-
-                    if tool_response['choices'][0]['message'].get('tool_calls', None) is not None:
-                        for tool_call in tool_response['choices'][0]['message']['tool_calls']:
-                            tool_call_rounds.append(tool_call)
-                    elif tool_response['choices'][0]['message'].get('content', None) is not None:
-                        response.stream(MarkdownData(tool_response['choices'][0]['message']['content']))
-
-                    messages.append(tool_response['choices'][0]['message'])
-
-                    had_tool_call = len(tool_call_rounds) > 0
-
-                    tool_name = None
-                    # handle first tool calls
-                    while len(tool_call_rounds) > 0:
-                        tool_call = tool_call_rounds[0]
-                        if "id" not in tool_call:
-                            tool_call['id'] = uuid.uuid4().hex
-                        tool_call_rounds = tool_call_rounds[1:]
-
-                        tool_name = tool_call['function']['name']
-
-                        tool_to_call = self._get_tool_schema_by_name(tool_name)
-
-                        tool_temp = self._get_tool_by_name(tool_name) #TODO
-                        
-
-                        server = self.client.get_server_by_tool(tool_temp)
-
-                        
-                        if tool_to_call is None:
-                            logging.error(f"Tool not found: {tool_name}, args: {tool_call['function']['arguments']}")
-                            response.stream(MarkdownData("Oops! Failed to find requested tool. Please try again with a different prompt."))
-                            response.finish()
-                            return
-
-                        if type(tool_call['function']['arguments']) is dict:
-                            args = tool_call['function']['arguments']
-                        elif not tool_call['function']['arguments'].startswith('{'):
-                            args = tool_call['function']['arguments']
-                        else:
-                            args = fuzzy_json_loads(tool_call['function']['arguments'])
-
-                        tool_properties = tool_to_call["function"]["parameters"]["properties"]
-
-                        if type(args) is str:
-                            if len(tool_properties) == 1 and tool_call['function']['arguments'] is not None:
-                                tool_property = list(tool_properties.keys())[0]
-                                args = {tool_property: args}
-                            else:
-                                args = {}
-
-                        if len(tool_properties) != len(args):
-                            response.stream(MarkdownData(f"Oops! There was a problem handling tool request. Please try again with a different prompt."))
-                            response.finish()
-                            return
-
-                        response.stream(MarkdownData(f"Calling tool {tool_name} "))
-
-                        logging.info(f"Attempting to call tool {tool_name} with args {args}")
-                        
-                        tool_call_response = await server.execute_tool(tool_name, args)
-
-                        content_text = ""
-                        for content_item in tool_call_response.content:
-                            if content_item.type == "text":
-                                content_text += content_item.text
-                            elif content_item.type == "image":
-                                content_text += f"[Image: {content_item.mimeType}]"
-                            elif content_item.type == "resource":
-                                if isinstance(content_item.resource, TextResourceContents):
-                                    content_text += content_item.resource.text
-                                else:
-                                    content_text += f"[Binary Resource: {content_item.resource.mimeType}]"
-
-                        function_call_result_message = {
-                            "role": "tool",
-                            "content": content_text,
-                            "tool_call_id": tool_call['id']
-                        }
-
-                        messages.append(function_call_result_message)
-
-                    if had_tool_call:
-                        await _tool_call_loop(tool_call_rounds)
-                        return
-
-                    if len(tool_call_rounds) > 0:
-                        await _tool_call_loop(tool_call_rounds)
-                        return
-                    
-                    logging.debug("Tool call round completed")
-                except Exception as e:
-                    # error_msg = f"Error calling tool {tool_name}: {str(e)}"
-                    error_msg = f"Error calling tool: {str(e)}"
-                    logging.error(error_msg)
-                    logging.error(f"Stack trace:", exc_info=True)
-                    response.stream(MarkdownData(error_msg))
-                    response.finish()
-
-
-            await _tool_call_loop(tool_call_rounds)
+            startup_report = await self.client.initialize_servers()
+            if startup_report:
+                response.stream(MarkdownData(self._format_startup_report(startup_report)))
+            await self.client.all_tools()
+            # The registry and config are read once so that a catalog refresh
+            # or config update by another chat does not change them mid-request.
+            registry = self.client.registry
+            agent_settings = Configuration.agent_settings(self.client.server_config)
+            agent_loop = AgentLoop(self.client, request, response, registry, agent_settings, tool_choice)
+            await agent_loop.run()
 
         except asyncio.CancelledError as e:
             logging.error(f"Chat request cancelled by: {e}")
@@ -332,8 +558,6 @@ class MCPChatParticipant(ChatParticipant):
             response.stream(MarkdownData(f"Error handling chat request: {e}"))
             response.finish()
         finally :
-            await self.client.cleanup_servers()
-            self.cleanup_server_tools()
             response.finish()
             return
         
@@ -362,4 +586,5 @@ class MCPExtension(NotebookIntelligenceExtension):
         """Activate the MCP extension."""
         self.participant = MCPChatParticipant(host)
         host.register_chat_participant(self.participant)
+        self.participant.client.watch_config(Configuration.default_config_path())
         logging.info("MCP extension activated")
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""Jupyter server handlers of the MCP agent."""
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+from jupyter_server.utils import url_path_join
+
+from nbi_mcp_agent.metrics import METRICS
+
+
+class MetricsHandler(APIHandler):
+    """Serves the agent metrics in the Prometheus text format."""
+
+    @tornado.web.authenticated
+    def get(self) -> None:
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.finish(METRICS.render_prometheus())
+
+
+def setup_handlers(web_app) -> None:
+    base_url = web_app.settings["base_url"]
+    web_app.add_handlers(".*$", [
+        (url_path_join(base_url, "nbi-mcp-agent", "metrics"), MetricsHandler),
+    ])
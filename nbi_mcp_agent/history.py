@@ -0,0 +1,183 @@
+"""Compaction of the chat history sent with each completion round."""
+
+import logging
+
+from nbi_mcp_agent.metrics import HISTORY_COMPACTED_MESSAGES
+from nbi_mcp_agent.tool_results import READ_TOOL_RESULT, ToolResultStore
+
+
+logging = logging.getLogger(__name__)
+
+# Rough size of a token in characters, good enough for English text and JSON.
+CHARS_PER_TOKEN = 4
+# Tokens of the role and framing of each message.
+MESSAGE_OVERHEAD_TOKENS = 4
+# Start of the note closing a digested tool result.
+DIGEST_NOTE = "[Earlier result of "
+
+
+def estimate_tokens(message: dict) -> int:
+    """Estimate the prompt tokens of one message from its size in characters."""
+    chars = len(str(message.get("content") or ""))
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        chars += len(function.get("name", "")) + len(str(function.get("arguments", "")))
+    return chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+class HistoryCompactor:
+    """Keeps the messages of an agent loop within a token budget.
+
+    Before each completion round :meth:`compact` estimates the size of the
+    history and, when it is over ``history_max_tokens``, shrinks it in place,
+    oldest messages first:
+
+    1. Tool results are replaced by a short digest. The full result is saved
+       in the :class:`ToolResultStore`, and the digest tells the model how to
+       read it back with ``read_tool_result``.
+    2. Tool call exchanges whose results were digested are dropped: the
+       assistant message loses its ``tool_calls`` together with their
+       results, keeping any text it had.
+    3. The oldest remaining messages are dropped.
+
+    System messages, the latest user message and the last
+    ``history_keep_rounds`` assistant messages with their tool results are
+    never changed. Every ``tool_call_id`` kept has its ``tool_calls`` entry,
+    and the other way round.
+    """
+
+    def __init__(self, store: ToolResultStore, max_tokens: int, keep_rounds: int, digest_chars: int) -> None:
+        self.store = store
+        self.max_tokens: int = max_tokens
+        self.keep_rounds: int = keep_rounds
+        self.digest_chars: int = digest_chars
+        # Set once a digest points at a stored result.
+        self.spilled: bool = False
+
+    def compact(self, messages: list[dict]) -> int:
+        """Shrink ``messages`` in place to fit the budget. Returns the estimated tokens after compaction."""
+        sizes = [estimate_tokens(message) for message in messages]
+        total = sum(sizes)
+        if self.max_tokens <= 0 or total <= self.max_tokens:
+            return total
+        before = total
+
+        protected = self._protected(messages)
+        digested = 0
+        for i, message in enumerate(messages):
+            if total <= self.max_tokens:
+                break
+            if i in protected or message.get("role") != "tool" or self._is_compacted(message):
+                continue
+            digest = self._digest(message)
+            messages[i] = digest
+            total += estimate_tokens(digest) - sizes[i]
+            sizes[i] = estimate_tokens(digest)
+            digested += 1
+
+        dropped = 0
+        if total > self.max_tokens:
+            total, dropped = self._drop_exchanges(messages, total)
+        if total > self.max_tokens:
+            total, trimmed = self._drop_oldest(messages, total)
+            dropped += trimmed
+
+        if digested or dropped:
+            HISTORY_COMPACTED_MESSAGES.inc(digested, action="digest")
+            HISTORY_COMPACTED_MESSAGES.inc(dropped, action="drop")
+            logging.info(
+                f"Compacted chat history from {before} to {total} estimated tokens: "
+                f"{digested} tool results digested, {dropped} messages dropped"
+            )
+            if total > self.max_tokens:
+                logging.warning(f"Recent chat history alone exceeds history_max_tokens ({self.max_tokens})")
+        return total
+
+    def _protected(self, messages: list[dict]) -> set[int]:
+        """Indexes of the messages that are kept verbatim."""
+        protected = {i for i, message in enumerate(messages) if message.get("role") == "system"}
+        last_user = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "user"), None)
+        if last_user is not None:
+            protected.add(last_user)
+        assistants = [i for i, message in enumerate(messages) if message.get("role") == "assistant"]
+        if self.keep_rounds > 0 and assistants:
+            start = assistants[-self.keep_rounds] if len(assistants) >= self.keep_rounds else assistants[0]
+            protected.update(range(start, len(messages)))
+        return protected
+
+    def _is_compacted(self, message: dict) -> bool:
+        """Whether a tool result is a digest already or too short to digest."""
+        content = str(message.get("content") or "")
+        return len(content) <= self.digest_chars or DIGEST_NOTE in content
+
+    def _digest(self, message: dict) -> dict:
+        """Return a copy of a tool message with its content replaced by a digest."""
+        content = str(message.get("content") or "")
+        preview = " ".join(content[:self.digest_chars].split())
+        handle = self.store.save(content)
+        if handle is None:
+            note = f"{DIGEST_NOTE}{len(content)} characters shortened.]"
+        else:
+            self.spilled = True
+            note = (
+                f"{DIGEST_NOTE}{len(content)} characters shortened. "
+                f"Call {READ_TOOL_RESULT.name} with handle \"{handle}\", an offset and a length to read it.]"
+            )
+        return {**message, "content": f"{preview}...\n{note}"}
+
+    def _drop_exchanges(self, messages: list[dict], total: int) -> tuple[int, int]:
+        """Drop compacted tool call exchanges, oldest first, until the history fits."""
+        dropped = 0
+        i = 0
+        while i < len(messages) and total > self.max_tokens:
+            protected = self._protected(messages)
+            message = messages[i]
+            if i in protected or message.get("role") != "assistant" or not message.get("tool_calls"):
+                i += 1
+                continue
+            results = self._tool_results(messages, i)
+            if any(j in protected or not self._is_compacted(messages[j]) for j in results):
+                i += 1
+                continue
+
+            for j in reversed(results):
+                total -= estimate_tokens(messages[j])
+                del messages[j]
+            total -= estimate_tokens(message)
+            dropped += len(results)
+            if message.get("content"):
+                messages[i] = {"role": "assistant", "content": message["content"]}
+                total += estimate_tokens(messages[i])
+                i += 1
+            else:
+                del messages[i]
+                dropped += 1
+        return total, dropped
+
+    def _drop_oldest(self, messages: list[dict], total: int) -> tuple[int, int]:
+        """Drop the oldest unprotected messages, with the tool results of dropped tool calls."""
+        dropped = 0
+        while total > self.max_tokens:
+            protected = self._protected(messages)
+            i = next((i for i in range(len(messages)) if i not in protected), None)
+            if i is None:
+                break
+            removed = [i] + self._tool_results(messages, i)
+            if any(j in protected for j in removed):
+                break
+            for j in reversed(removed):
+                total -= estimate_tokens(messages[j])
+                del messages[j]
+            dropped += len(removed)
+        return total, dropped
+
+    @staticmethod
+    def _tool_results(messages: list[dict], index: int) -> list[int]:
+        """Indexes of the tool results answering the tool calls of the message at ``index``."""
+        call_ids = {tool_call.get("id") for tool_call in messages[index].get("tool_calls") or []}
+        if not call_ids:
+            return []
+        return [
+            j for j in range(index + 1, len(messages))
+            if messages[j].get("role") == "tool" and messages[j].get("tool_call_id") in call_ids
+        ]
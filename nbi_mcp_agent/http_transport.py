@@ -0,0 +1,100 @@
+"""Shared HTTP clients of the remote (SSE and streamable HTTP) MCP transports."""
+
+import json
+import logging
+from typing import Any
+
+import httpx
+
+
+logging = logging.getLogger(__name__)
+
+DEFAULT_HTTP_TIMEOUT = 30.0
+DEFAULT_SSE_READ_TIMEOUT = 300.0
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+
+def transport_kind(config: dict[str, Any]) -> str:
+    """Transport of a server entry: ``stdio``, ``sse`` or ``streamable_http``.
+
+    Entries with a ``url`` use ``transport`` if set, else SSE for URLs ending
+    in ``/sse`` and streamable HTTP otherwise.
+    """
+    if not config.get("url"):
+        return "stdio"
+    transport = config.get("transport")
+    if transport:
+        return transport.replace("-", "_")
+    return "sse" if config["url"].rstrip("/").endswith("/sse") else "streamable_http"
+
+
+class _SharedClient:
+    """Async context manager over a shared client that leaves it open on exit."""
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+
+    async def __aenter__(self) -> httpx.AsyncClient:
+        return self.client
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+
+class HttpClientPool:
+    """Keep-alive HTTP clients shared by all sessions to remote MCP servers.
+
+    Server entries with the same ``headers`` and timeouts share one
+    ``httpx.AsyncClient``, so sessions to one host reuse its connection pool
+    instead of opening their own. Clients are created on first use on the
+    running loop, which must be the loop the sessions run on.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+    ) -> None:
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get(self, config: dict[str, Any]) -> httpx.AsyncClient:
+        """Return the client for a server entry, creating it on first use."""
+        headers = config.get("headers") or {}
+        timeout = config.get("http_timeout", DEFAULT_HTTP_TIMEOUT)
+        sse_read_timeout = config.get("sse_read_timeout", DEFAULT_SSE_READ_TIMEOUT)
+        key = json.dumps([headers, timeout, sse_read_timeout], sort_keys=True)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            # Redirects are followed by the MCP transports themselves.
+            client = httpx.AsyncClient(
+                headers=headers,
+                timeout=httpx.Timeout(timeout, read=sse_read_timeout),
+                limits=self.limits,
+                follow_redirects=False,
+            )
+            self._clients[key] = client
+        return client
+
+    def client_factory(self, config: dict[str, Any]):
+        """Return an ``httpx_client_factory`` for ``sse_client`` that hands out the shared client."""
+        def _factory(headers: Any = None, timeout: Any = None, auth: Any = None) -> _SharedClient:
+            return _SharedClient(self.get(config))
+
+        return _factory
+
+    async def aclose(self) -> None:
+        """Close all clients. Clients are created again when next needed."""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logging.warning(f"Error closing HTTP client: {e}")
@@ -1,81 +1,348 @@
 import asyncio
 import json
 import logging
-from typing import Any
-from mcp import ClientSession
+from typing import Any, Callable
+from mcp import ClientSession, types
+from jupyter_core.paths import jupyter_config_dir
+from notebook_intelligence import CancelToken
 from fuzzy_json import loads as fuzzy_json_loads
 from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamable_http_client
 from contextlib import AsyncExitStack
+from nbi_mcp_agent.http_transport import DEFAULT_SSE_READ_TIMEOUT, HttpClientPool, transport_kind
+from nbi_mcp_agent.metrics import (
+    LIST_TOOLS_SECONDS, SERVER_INITIALIZE_SECONDS, SERVER_SPAWN_SECONDS, TOOL_CALL_RETRIES, timed,
+)
+from nbi_mcp_agent.tool_arguments import ArgumentValidator
+from nbi_mcp_agent.supervisor import (
+    DEFAULT_BACKOFF_BASE, DEFAULT_FAILURE_THRESHOLD, DEFAULT_HEALTH_CHECK_INTERVAL,
+    CircuitBreaker, backoff_delay, is_retryable,
+)
 import shutil
 import os
+import time
 
 
 logging = logging.getLogger(__name__)
 
+CONFIG_PATH_ENV = "NBI_MCP_AGENT_CONFIG"
+DEFAULT_STARTUP_TIMEOUT = 30.0
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_RETRIES = 3
+
+# Agent wide settings, overridable in the "agent" section of the config file.
+AGENT_SETTINGS_DEFAULTS: dict[str, Any] = {
+    "stream_completions": False,
+    "parallel_tool_calls": True,
+    "max_parallel_tool_calls": 8,
+    "max_rounds": 10,
+    "max_tool_calls": 30,
+    "max_duration": 300,
+    "max_repeated_tool_calls": 2,
+    "result_cache_max_entries": 256,
+    "result_cache_max_bytes": 16 * 1024 * 1024,
+    "max_tool_result_chars": 20000,
+    "max_tool_results_chars": 100000,
+    "tool_selection_top_k": 20,
+    "tool_selection_min_tools": 40,
+    "history_max_tokens": 32000,
+    "history_keep_rounds": 2,
+    "history_digest_chars": 500,
+    "health_check_interval": DEFAULT_HEALTH_CHECK_INTERVAL,
+    "tool_timeout": 120,
+    "config_poll_interval": 2.0,
+    "drain_timeout": 30.0,
+}
+
 class Configuration:
     """Manages configuration and environment variables for the MCP client."""
 
+    @staticmethod
+    def default_config_path() -> str:
+        """Config file used at start-up: ``$NBI_MCP_AGENT_CONFIG``, else ``nbi_mcp_agent.json`` in the Jupyter config dir."""
+        return os.environ.get(CONFIG_PATH_ENV) or os.path.join(jupyter_config_dir(), "nbi_mcp_agent.json")
+
     @staticmethod
     def load_config(file_path: str) -> dict[str, Any]:
         with open(file_path, "r") as f:
             return json.load(f)
 
-class Server:
-    """Manages MCP server connections and tool execution."""
+    @staticmethod
+    def agent_settings(config: dict[str, Any]) -> dict[str, Any]:
+        """Return the agent settings of a config, filled in with defaults."""
+        return {**AGENT_SETTINGS_DEFAULTS, **config.get("agent", {})}
 
-    def __init__(self, name: str, config: dict[str, Any]) -> None:
-        self.name: str = name
-        self.config: dict[str, Any] = config
-        self.stdio_context: Any | None = None
+class ToolCallCancelled(Exception):
+    """A tool call was cancelled by the user or timed out."""
+
+
+class ServerConnection:
+    """One transport and client session to an MCP server.
+
+    The connection is owned by a background task that keeps the session open
+    until :meth:`close` is called, so it can be reused across chat requests.
+    """
+
+    def __init__(self, server: "Server") -> None:
+        self.server: Server = server
         self.session: ClientSession | None = None
-        self._cleanup_lock: asyncio.Lock = asyncio.Lock()
-        self.exit_stack: AsyncExitStack = AsyncExitStack()
-        self._connection_lock: asyncio.Lock = asyncio.Lock()
+        self.in_flight: int = 0
+        self.last_used: float = time.monotonic()
+        self._task: asyncio.Task | None = None
+        self._shutdown_event: asyncio.Event | None = None
+
+    @property
+    def is_alive(self) -> bool:
+        """Whether the session is open and its connection task still running."""
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def open(self) -> None:
+        """Open the connection.
+
+        A server that does not finish initializing within the configured
+        ``startup_timeout`` is stopped and ``asyncio.TimeoutError`` is raised.
+        """
+        name = self.server.name
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._shutdown_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready), name=f"mcp-server-{name}")
+        timeout = self.server.config.get("startup_timeout", DEFAULT_STARTUP_TIMEOUT)
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), timeout)
+        except BaseException as e:
+            if isinstance(e, asyncio.TimeoutError):
+                logging.error(f"Server {name} did not initialize within {timeout} seconds.")
+            # Stop a connection that is still starting, e.g. when the caller was cancelled.
+            ready.cancel()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            raise
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        """Open the transport and session, then hold them until shutdown."""
+        name = self.server.name
+        try:
+            # The transport and session contexts are entered and exited in
+            # this task, as anyio requires, whichever request triggered them.
+            async with AsyncExitStack() as exit_stack:
+                with timed(SERVER_SPAWN_SECONDS, "mcp.server.spawn", server=name):
+                    read, write = await self._open_transport(exit_stack)
+                session = await exit_stack.enter_async_context(
+                    ClientSession(read, write, message_handler=self.server._handle_message)
+                )
+                with timed(SERVER_INITIALIZE_SECONDS, "mcp.server.initialize", server=name):
+                    await session.initialize()
+                self.session = session
+                logging.info(f"Server {name} initialized successfully.")
+                ready.set_result(None)
+                await self._shutdown_event.wait()
+        except Exception as e:
+            if not ready.done():
+                logging.error(f"Error initializing server {name}: {e}")
+                ready.set_exception(e)
+            else:
+                logging.error(f"Server {name} connection closed with error: {e}")
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.set_exception(RuntimeError(f"Server {name} stopped during initialization"))
+
+    async def _open_transport(self, exit_stack: AsyncExitStack) -> tuple[Any, Any]:
+        """Start the server process, or connect to its ``url``, and return the read and write streams."""
+        config = self.server.config
+        http_clients = self.server.http_clients
+        transport = transport_kind(config)
+
+        if transport == "streamable_http":
+            read, write, _ = await exit_stack.enter_async_context(
+                streamable_http_client(
+                    config["url"], http_client=http_clients.get(config) if http_clients else None
+                )
+            )
+            return read, write
+        if transport == "sse":
+            sse_options: dict[str, Any] = {}
+            if http_clients is not None:
+                sse_options["httpx_client_factory"] = http_clients.client_factory(config)
+            else:
+                sse_options["headers"] = config.get("headers")
+            return await exit_stack.enter_async_context(
+                sse_client(
+                    config["url"],
+                    sse_read_timeout=config.get("sse_read_timeout", DEFAULT_SSE_READ_TIMEOUT),
+                    **sse_options,
+                )
+            )
+        if transport != "stdio":
+            raise ValueError(f"Unknown transport {transport!r}, expected 'sse' or 'streamable_http'.")
 
-    async def initialize(self) -> None:
-        """Initialize the server connection."""
         command = (
             shutil.which("npx")
-            if self.config["command"] == "npx"
-            else self.config["command"]
+            if config.get("command") == "npx"
+            else config.get("command")
         )
         if command is None:
             raise ValueError("The command must be a valid string and cannot be None.")
 
         server_params = StdioServerParameters(
             command=command,
-            args=self.config["args"],
-            env={**os.environ, **self.config["env"]}
-            if self.config.get("env")
+            args=config.get("args", []),
+            env={**os.environ, **config["env"]}
+            if config.get("env")
             else None,
         )
+        return await exit_stack.enter_async_context(stdio_client(server_params))
+
+    async def is_responsive(self, timeout: float = 5.0) -> bool:
+        """Ping the session and report whether it answered in time."""
+        if not self.is_alive:
+            return False
         try:
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
-            read, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read, write)
-            )
-            await session.initialize()
-            self.session = session
-            logging.info(f"Server {self.name} initialized successfully.")
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
         except Exception as e:
-            logging.error(f"Error initializing server {self.name}: {e}")
-            read.aclose()
-            write.aclose()
+            logging.warning(f"Server {self.server.name} did not answer ping: {e}")
+            return False
+
+    async def close(self) -> None:
+        task = self._task
+        if task is None:
+            return
+        try:
+            self._shutdown_event.set()
+            await task
+        finally:
+            self._task = None
+            self.session = None
+
+
+class Server:
+    """Manages MCP server connections and tool execution.
+
+    A server keeps up to ``pool_size`` connections (default 1), each running
+    at most ``max_concurrency`` tool calls at once. Calls lease the least
+    busy connection, another connection is opened when all are busy and the
+    pool is not full, and otherwise calls wait for a free slot, for at most
+    ``queue_timeout`` seconds if set. Extra connections idle for
+    ``idle_timeout`` seconds are closed again; 0 keeps them open.
+
+    Entries with a ``url`` connect to a remote server over SSE or streamable
+    HTTP instead of starting a process; their connections share the
+    keep-alive clients of ``http_clients`` when given.
+    """
+
+    def __init__(self, name: str, config: dict[str, Any], http_clients: HttpClientPool | None = None) -> None:
+        self.name: str = name
+        self.config: dict[str, Any] = config
+        self.http_clients: HttpClientPool | None = http_clients
+        self.tools: list[ToolWrapper] | None = None
+        self.on_tools_changed: Callable[["Server"], None] | None = None
+        self.pool_size: int = max(config.get("pool_size", 1), 1)
+        self.breaker: CircuitBreaker = CircuitBreaker(
+            config.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD),
+            config.get("retry_delay", DEFAULT_BACKOFF_BASE),
+        )
+        # Set once the server was asked to start; the supervisor restarts it from then on.
+        self.supervised: bool = False
+        # Set when the server is removed or shut down; it cannot be started again.
+        self.closed: bool = False
+        self.max_concurrency: int = config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)
+        self._connections: list[ServerConnection] = []
+        self._opening: int = 0
+        self._pool_changed: asyncio.Condition = asyncio.Condition()
+        self._cleanup_lock: asyncio.Lock = asyncio.Lock()
+        self._connection_lock: asyncio.Lock = asyncio.Lock()
+        self._reaper_task: asyncio.Task | None = None
+
+    @property
+    def session(self) -> ClientSession | None:
+        """Session of the first live connection, used for tool discovery."""
+        for connection in self._connections:
+            if connection.is_alive:
+                return connection.session
+        return None
+
+    @property
+    def is_alive(self) -> bool:
+        """Whether the server has at least one live connection."""
+        return self.session is not None
+
+    async def initialize(self) -> None:
+        """Initialize the server connection.
+
+        Calling this on a live server is a no-op. A failed start counts
+        against the circuit breaker of the server, a successful one closes it.
+        """
+        async with self._connection_lock:
+            if self.is_alive:
+                return
+            self.check_open()
             await self.cleanup()
-            raise
 
-    
+            self.supervised = True
+            self.tools = None
+            connection = ServerConnection(self)
+            try:
+                await connection.open()
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            async with self._pool_changed:
+                self._connections.append(connection)
+                self._pool_changed.notify_all()
+            idle_timeout = self.config.get("idle_timeout", DEFAULT_IDLE_TIMEOUT)
+            if self.pool_size > 1 and idle_timeout > 0 and self._reaper_task is None:
+                self._reaper_task = asyncio.create_task(self._close_idle_connections())
+
+    def check_open(self) -> None:
+        if self.closed:
+            raise RuntimeError(f"Server {self.name} was stopped")
+
+    def check_available(self) -> None:
+        """Fail fast while the circuit breaker is open and its backoff has not passed."""
+        if self.breaker.is_open and not self.breaker.retry_due:
+            raise RuntimeError(
+                f"Server {self.name} is unavailable after {self.breaker.failures} consecutive failures"
+            )
+
+    async def _handle_message(self, message: Any) -> None:
+        """Drop the cached tool list when the server reports that it changed."""
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            logging.info(f"Server {self.name} reported a tool list change.")
+            self.tools = None
+            if self.on_tools_changed is not None:
+                self.on_tools_changed(self)
+
+    async def restart(self) -> None:
+        """Close the current sessions and open a new one."""
+        await self.cleanup()
+        await self.initialize()
 
+    async def is_responsive(self, timeout: float = 5.0) -> bool:
+        """Ping the server session and report whether it answered in time."""
+        for connection in self._connections:
+            if connection.is_alive:
+                return await connection.is_responsive(timeout)
+        return False
 
     async def list_tools(self) -> list[Any]:
-        if not self.session:
+        """List the server tools, reusing the result for the life of the session."""
+        session = self.session
+        if not session:
             raise RuntimeError(f"Server {self.name} not initialized")
 
-        tools_response = await self.session.list_tools()
+        if self.tools is not None:
+            return self.tools
+
+        with timed(LIST_TOOLS_SECONDS, "mcp.server.list_tools", server=self.name):
+            tools_response = await session.list_tools()
         tools: list[ToolWrapper] = []
 
         for item in tools_response:
@@ -83,48 +350,250 @@ class Server:
                 for tool in item[1]:
                     tools.append(ToolWrapper(tool.name, tool.description, tool.inputSchema))
 
+        self.tools = tools
         return tools
 
+    async def _lease_connection(self, queue_timeout: float | None = None) -> ServerConnection:
+        """Reserve a call slot on the least busy connection, opening one if allowed.
+
+        Waiting for a free slot is limited to ``queue_timeout`` seconds. If an
+        extra connection fails to open, the call waits for the existing ones
+        instead.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if queue_timeout is None else loop.time() + queue_timeout
+        may_open = True
+        while True:
+            async with self._pool_changed:
+                while True:
+                    self.check_open()
+                    self._connections = [c for c in self._connections if c.is_alive or c.in_flight]
+                    available = [
+                        c for c in self._connections
+                        if c.is_alive and c.in_flight < self.max_concurrency
+                    ]
+                    if available:
+                        connection = min(available, key=lambda c: c.in_flight)
+                        connection.in_flight += 1
+                        return connection
+                    if may_open and len(self._connections) + self._opening < self.pool_size:
+                        self._opening += 1
+                        break
+                    remaining = None if deadline is None else deadline - loop.time()
+                    try:
+                        if remaining is not None and remaining <= 0:
+                            raise asyncio.TimeoutError
+                        await asyncio.wait_for(self._pool_changed.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        raise RuntimeError(
+                            f"Server {self.name} busy: no free slot within {queue_timeout}s"
+                        ) from None
+
+            connection = ServerConnection(self)
+            try:
+                await connection.open()
+            except Exception as e:
+                if not any(c.is_alive for c in self._connections):
+                    raise
+                logging.warning(f"Server {self.name} could not open another connection, waiting for a free one: {e!r}")
+                may_open = False
+                continue
+            finally:
+                async with self._pool_changed:
+                    self._opening -= 1
+                    if connection.is_alive:
+                        connection.in_flight += 1
+                        self._connections.append(connection)
+                    self._pool_changed.notify_all()
+            logging.info(f"Server {self.name} opened connection {len(self._connections)} of {self.pool_size}")
+            return connection
+
+    async def _release_connection(self, connection: ServerConnection) -> None:
+        async with self._pool_changed:
+            connection.in_flight -= 1
+            connection.last_used = time.monotonic()
+            self._pool_changed.notify_all()
+
+    async def _close_idle_connections(self) -> None:
+        """Close connections beyond the first that have been idle for ``idle_timeout`` (positive)."""
+        idle_timeout = self.config.get("idle_timeout", DEFAULT_IDLE_TIMEOUT)
+        while True:
+            await asyncio.sleep(idle_timeout / 2)
+            now = time.monotonic()
+            async with self._pool_changed:
+                idle = [
+                    c for c in self._connections[1:]
+                    if c.in_flight == 0 and now - c.last_used >= idle_timeout
+                ]
+                self._connections = [c for c in self._connections if c not in idle]
+            for connection in idle:
+                logging.info(f"Closing idle connection of server {self.name}")
+                await connection.close()
+
+    def tool_timeout(self, tool_name: str, default: float | None = None) -> float | None:
+        """Timeout of one call of a tool: ``tool_timeouts[tool_name]``, else ``tool_timeout``."""
+        timeout = self.config.get("tool_timeouts", {}).get(tool_name, self.config.get("tool_timeout", default))
+        return timeout or None
+
     async def execute_tool(
         self,
         tool_name: str,
         arguments: dict[str, Any],
-        retries: int = 2,
-        delay: float = 1.0,
+        retries: int | None = None,
+        delay: float | None = None,
+        timeout: float | None = None,
+        cancel_token: CancelToken | None = None,
     ) -> Any:
-        """Execute a tool on the server."""
+        """Execute a tool on the server.
 
-        if not self.session:
-            raise RuntimeError(f"Server {self.name} not initialized")
+        Each attempt leases a connection from the pool. Failures that may be
+        transient are retried up to ``retries`` attempts in total, after a
+        jittered exponential backoff starting at ``delay`` seconds; a
+        connection that no longer answers a ping is closed so the retry does
+        not go to a dead process. Calls fail fast while the circuit breaker
+        of the server is open.
+
+        A call running longer than ``timeout`` seconds, or still running when
+        ``cancel_token`` is cancelled, is cancelled on the server and raises
+        :class:`ToolCallCancelled` without being retried.
+        """
+        retries = retries or self.config.get("retries", DEFAULT_RETRIES)
+        delay = delay if delay is not None else self.config.get("retry_delay", DEFAULT_BACKOFF_BASE)
+        queue_timeout = self.config.get("queue_timeout")
+
+        self.check_available()
 
         attempt = 0
-        while attempt < retries:
+        while True:
+            connection = await self._lease_connection(queue_timeout)
             try:
                 logging.info(f"Executing {tool_name}...")
-                result = await self.session.call_tool(tool_name, arguments)
-
+                result = await self._call_tool(connection.session, tool_name, arguments, timeout, cancel_token)
+                self.breaker.record_success()
                 return result
-
+            except ToolCallCancelled:
+                raise
             except Exception as e:
-                attempt += 1
-                logging.warning(
-                    f"Error executing tool: {e}. Attempt {attempt} of {retries}."
+                error = e
+            finally:
+                await self._release_connection(connection)
+
+            attempt += 1
+            if not is_retryable(error):
+                logging.warning(f"Error executing tool {tool_name} is not retryable: {error}")
+                raise error
+            logging.warning(f"Error executing tool: {error}. Attempt {attempt} of {retries}.")
+            if attempt >= retries:
+                logging.error("Max retries reached. Failing.")
+                self.breaker.record_failure()
+                raise error
+
+            wait = backoff_delay(attempt - 1, delay)
+            logging.info(f"Retrying in {wait:.2f} seconds...")
+            TOOL_CALL_RETRIES.inc(server=self.name, tool=tool_name)
+            await asyncio.sleep(wait)
+            if not await connection.is_responsive():
+                logging.info(f"Reconnecting server {self.name}...")
+                await connection.close()
+
+    async def _call_tool(
+        self,
+        session: ClientSession,
+        tool_name: str,
+        arguments: dict[str, Any],
+        timeout: float | None,
+        cancel_token: CancelToken | None,
+    ) -> Any:
+        """Call a tool, cancelling the request on the server on timeout or user cancellation."""
+        request_id = None
+
+        async def _call() -> Any:
+            nonlocal request_id
+            # The id call_tool is about to assign, read in the same step as the call.
+            request_id = session._request_id
+            return await session.call_tool(tool_name, arguments)
+
+        loop = asyncio.get_running_loop()
+        cancelled = asyncio.Event()
+
+        def _on_cancel() -> None:
+            loop.call_soon_threadsafe(cancelled.set)
+
+        if cancel_token is not None:
+            cancel_token.cancellation_signal.connect(_on_cancel)
+            if cancel_token.is_cancel_requested:
+                cancelled.set()
+
+        call = asyncio.ensure_future(_call())
+        cancel_wait = asyncio.ensure_future(cancelled.wait())
+        reason = "was cancelled"
+        try:
+            done, _ = await asyncio.wait(
+                {call, cancel_wait}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if call in done:
+                return call.result()
+            if cancel_wait not in done:
+                reason = f"timed out after {timeout} seconds"
+            raise ToolCallCancelled(f"Tool {tool_name} on server {self.name} {reason}")
+        finally:
+            if cancel_token is not None:
+                cancel_token.cancellation_signal.disconnect(_on_cancel)
+            cancel_wait.cancel()
+            if not call.done():
+                call.cancel()
+                if request_id is not None:
+                    await self._notify_cancelled(session, request_id, reason)
+
+    async def _notify_cancelled(self, session: ClientSession, request_id: Any, reason: str) -> None:
+        """Tell the server to stop working on a request we no longer wait for."""
+        logging.info(f"Cancelling request {request_id} on server {self.name}: {reason}")
+        try:
+            await session.send_notification(
+                types.ClientNotification(
+                    types.CancelledNotification(
+                        params=types.CancelledNotificationParams(requestId=request_id, reason=reason)
+                    )
                 )
-                if attempt < retries:
-                    logging.info(f"Retrying in {delay} seconds...")
-                    await asyncio.sleep(delay)
-                else:
-                    logging.error("Max retries reached. Failing.")
-                    raise
+            )
+        except Exception as e:
+            logging.warning(f"Failed to send cancellation to server {self.name}: {e}")
+
+    async def drain(self, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for in-flight tool calls to finish, then stop the server."""
+        def _idle() -> bool:
+            return self._opening == 0 and all(c.in_flight == 0 for c in self._connections)
+
+        async def _wait_idle() -> None:
+            async with self._pool_changed:
+                await self._pool_changed.wait_for(_idle)
+
+        self.closed = True
+        try:
+            await asyncio.wait_for(_wait_idle(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Server {self.name} still had calls running after {timeout} seconds, stopping it.")
+        await self.close()
+
+    async def close(self) -> None:
+        """Stop the server for good: later calls fail instead of starting it again."""
+        self.closed = True
+        await self.cleanup()
 
     async def cleanup(self):
         """Clean up resources"""
         async with self._cleanup_lock:
+            if self._reaper_task is not None:
+                self._reaper_task.cancel()
+                self._reaper_task = None
+            async with self._pool_changed:
+                connections, self._connections = self._connections, []
+                self._pool_changed.notify_all()
             try:
-                await self.exit_stack.aclose()
-                self.session = None
-                self.stdio_context = None
-                logging.debug(f"Server cleaned up {self.name}")
+                for connection in reversed(connections):
+                    await connection.close()
+                if connections:
+                    logging.debug(f"Server cleaned up {self.name}")
             except Exception as e:
                 logging.error(f"Error during cleanup of server {self.name}: {e}")
                 raise
@@ -132,14 +601,30 @@ class Server:
 class ToolWrapper:
     """Represents a tool with its properties and formatting."""
 
+    __slots__ = ("name", "description", "input_schema", "_schema", "_validator")
+
     def __init__(self, name: str, description: str, input_schema: dict[str, Any]) -> None:
         self.name: str = name
         self.description: str = description
         self.input_schema: dict[str, Any] = input_schema
+        self._schema: dict[str, Any] | None = None
+        self._validator: ArgumentValidator | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ToolWrapper":
+        return cls(data["name"], data.get("description"), data.get("input_schema", {}))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": self.input_schema,
+        }
 
-    
     def convert_tool_to_schema(self):
-        schema = {
+        """Return the chat completions tool schema. Built once and shared, do not mutate."""
+        if self._schema is None:
+            self._schema = {
                 "type": "function",
                 "function": {
                     "name": self.name,
@@ -152,8 +637,14 @@ class ToolWrapper:
                     }
                 }
             }
-        return schema
-    
+        return self._schema
+
+    def argument_validator(self) -> ArgumentValidator:
+        """Return the validator of the tool arguments, compiled on first use."""
+        if self._validator is None:
+            self._validator = ArgumentValidator(self.input_schema)
+        return self._validator
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, ToolWrapper):
             return NotImplemented
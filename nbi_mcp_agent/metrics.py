@@ -0,0 +1,187 @@
+"""Counters, histograms and trace spans of the MCP agent.
+
+Metrics are kept in the process wide :data:`METRICS` registry, served in
+the Prometheus text format by the ``/nbi-mcp-agent/metrics`` Jupyter server
+handler and summarized by ``@mcp-agent /stats``. When OpenTelemetry is
+installed, :func:`timed` blocks are also recorded as spans.
+"""
+
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Iterator, Optional
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:
+    _otel_trace = None
+
+
+DEFAULT_TIME_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+DEFAULT_SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _label_key(labels: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name: str = name
+        self.help: str = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[tuple[dict[str, str], float]]:
+        with self._lock:
+            return [(dict(key), value) for key, value in self._values.items()]
+
+    def render(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}_total{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram:
+    """Histogram with labels and fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_TIME_BUCKETS) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.buckets: tuple = tuple(buckets)
+        # Per label set: bucket counts, count, sum and max.
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += 1
+            entry[2] += value
+            entry[3] = max(entry[3], value)
+
+    def samples(self) -> list[tuple[dict[str, str], dict[str, float]]]:
+        """Return count, sum, mean and max per label set."""
+        with self._lock:
+            return [
+                (dict(key), {"count": count, "sum": total, "mean": total / count if count else 0.0, "max": maximum})
+                for key, (_, count, total, maximum) in self._values.items()
+            ]
+
+    def render(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for key, (bucket_counts, count, total, _) in self._values.items():
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {bucket_count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named set of counters and histograms."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Any] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: tuple = DEFAULT_TIME_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def metrics(self) -> list[Any]:
+        return list(self._metrics.values())
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            name = f"{metric.name}_total" if metric.kind == "counter" else metric.name
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+SERVER_SPAWN_SECONDS = METRICS.histogram(
+    "nbi_mcp_server_spawn_seconds", "Time to start an MCP server process, or connect to a remote one, and open its transport.")
+SERVER_INITIALIZE_SECONDS = METRICS.histogram(
+    "nbi_mcp_server_initialize_seconds", "Time of the MCP initialize handshake.")
+SERVER_RESTARTS = METRICS.counter(
+    "nbi_mcp_server_restarts", "Restarts of MCP servers by the supervisor.")
+SERVER_HEALTH_CHECK_FAILURES = METRICS.counter(
+    "nbi_mcp_server_health_check_failures", "Failed health checks of MCP servers.")
+LIST_TOOLS_SECONDS = METRICS.histogram(
+    "nbi_mcp_list_tools_seconds", "Time to list the tools of an MCP server.")
+COMPLETION_SECONDS = METRICS.histogram(
+    "nbi_mcp_completion_seconds", "Time of one chat model completion round.")
+TOOL_CALL_SECONDS = METRICS.histogram(
+    "nbi_mcp_tool_call_seconds", "Time to execute a tool call, including retries.")
+TOOL_CALL_ERRORS = METRICS.counter(
+    "nbi_mcp_tool_call_errors", "Failed tool calls by error type.")
+TOOL_CALL_RETRIES = METRICS.counter(
+    "nbi_mcp_tool_call_retries", "Retried tool call attempts.")
+TOOL_ARGUMENTS_BYTES = METRICS.histogram(
+    "nbi_mcp_tool_arguments_bytes", "Size of tool call arguments in bytes.", DEFAULT_SIZE_BUCKETS)
+TOOL_RESULT_BYTES = METRICS.histogram(
+    "nbi_mcp_tool_result_bytes", "Size of the content of tool results in characters.", DEFAULT_SIZE_BUCKETS)
+RESULT_CACHE_REQUESTS = METRICS.counter(
+    "nbi_mcp_result_cache_requests", "Lookups in the tool result cache by result (hit or miss).")
+HISTORY_COMPACTED_MESSAGES = METRICS.counter(
+    "nbi_mcp_history_compacted_messages", "Chat history messages digested or dropped to fit the token budget, by action.")
+CHAT_REQUEST_SECONDS = METRICS.histogram(
+    "nbi_mcp_chat_request_seconds", "Time of the agent loop of one chat request, by stop reason.")
+
+
+@contextmanager
+def timed(histogram: Histogram, span_name: Optional[str] = None, **labels: Any) -> Iterator[dict[str, Any]]:
+    """Observe the duration of a block in ``histogram``.
+
+    Labels added to the yielded dict inside the block are included in the
+    observation. If OpenTelemetry is installed the block is also recorded as
+    a span named ``span_name`` with the initial labels as attributes.
+    """
+    with ExitStack() as stack:
+        if _otel_trace is not None and span_name is not None:
+            stack.enter_context(_otel_trace.get_tracer(__name__).start_as_current_span(
+                span_name, attributes={name: str(value) for name, value in labels.items()}
+            ))
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            histogram.observe(time.perf_counter() - started, **labels)
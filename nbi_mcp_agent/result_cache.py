@@ -0,0 +1,100 @@
+"""In-memory cache of tool call results for read-only tools."""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+DEFAULT_RESULT_CACHE_TTL = 300.0
+
+
+class ToolResultCache:
+    """LRU cache of tool results, keyed by server, tool and canonicalized arguments.
+
+    Caching is opt-in per server through a ``result_cache`` entry in its
+    config::
+
+        "result_cache": {
+            "ttl": 300,
+            "tools": ["get_forecast", "get_alerts"],
+            "tool_ttl": {"get_alerts": 60}
+        }
+
+    ``tools`` is the allow-list of cacheable tools; without it every tool of
+    the server is cached. Entries expire after their TTL and the least
+    recently used ones are evicted once ``max_entries`` or ``max_bytes`` is
+    exceeded.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, int, Any]] = OrderedDict()
+        self._size: int = 0
+
+    @staticmethod
+    def ttl_for(server_config: dict[str, Any], tool_name: str) -> Optional[float]:
+        """Return the TTL of a tool, or None if its results must not be cached."""
+        cache_config = server_config.get("result_cache")
+        if not cache_config:
+            return None
+        allowed = cache_config.get("tools")
+        if allowed is not None and tool_name not in allowed:
+            return None
+        return cache_config.get("tool_ttl", {}).get(
+            tool_name, cache_config.get("ttl", DEFAULT_RESULT_CACHE_TTL)
+        )
+
+    @staticmethod
+    def make_key(server_name: str, tool_name: str, arguments: dict[str, Any]) -> tuple[str, str, str]:
+        canonical_args = json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+        return server_name, tool_name, canonical_args
+
+    def get(self, key: tuple[str, str, str]) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, size, result = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple[str, str, str], result: Any, ttl: float, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, result)
+        self._size += size
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: tuple[str, str, str]) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+    def discard_server(self, server_name: str) -> None:
+        """Drop the cached results of one server."""
+        for key in [key for key in self._entries if key[0] == server_name]:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
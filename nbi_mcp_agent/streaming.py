@@ -0,0 +1,119 @@
+"""Assembly of streamed chat completions into an assistant message."""
+
+import json
+import threading
+from typing import Any, Callable, Optional
+
+from notebook_intelligence import ChatResponse, MarkdownData
+
+
+class StreamingCompletion(ChatResponse):
+    """Response passed to a streaming ``chat_model.completions`` call.
+
+    Content deltas are forwarded to the chat response as they arrive, and
+    ``tool_calls`` deltas are assembled by index. ``on_tool_call`` is called
+    with each tool call once its arguments are complete: when they parse as
+    a JSON object, when the next call starts, or when the stream ends.
+
+    Chat models call :meth:`stream` from the completion worker thread, so
+    ``on_tool_call`` runs on that thread too. The real response is never
+    finished here; the agent loop does that.
+    """
+
+    def __init__(self, response: ChatResponse, on_tool_call: Optional[Callable[[dict], None]] = None) -> None:
+        super().__init__()
+        self.response = response
+        self.on_tool_call = on_tool_call
+        self.content: list[str] = []
+        self.tool_calls: list[dict] = []
+        self._completed: set[int] = set()
+        self._detached: bool = False
+        self._lock = threading.Lock()
+
+    @property
+    def message_id(self) -> str:
+        return self.response.message_id
+
+    def stream(self, data: Any, finish: bool = False) -> None:
+        if self._detached:
+            return
+        if not isinstance(data, dict):
+            self.response.stream(data)
+            return
+        for choice in data.get("choices") or []:
+            delta = choice.get("delta") or choice.get("message") or {}
+            content = delta.get("content")
+            if content:
+                self.content.append(content)
+                self.response.stream(MarkdownData(content))
+            for tool_call_delta in delta.get("tool_calls") or []:
+                self._add_tool_call_delta(tool_call_delta)
+
+    def finish(self) -> None:
+        pass
+
+    def detach(self) -> None:
+        """Ignore the rest of the stream, e.g. once the agent loop gave up waiting for it."""
+        self._detached = True
+
+    def _add_tool_call_delta(self, tool_call_delta: dict) -> None:
+        index = tool_call_delta.get("index", len(self.tool_calls))
+        function = tool_call_delta.get("function") or {}
+        completed = []
+        with self._lock:
+            # A new call starts: the calls before it are complete.
+            for earlier in range(min(index, len(self.tool_calls))):
+                completed.extend(self._complete(earlier))
+            while len(self.tool_calls) <= index:
+                self.tool_calls.append({"type": "function", "function": {"name": "", "arguments": ""}})
+            tool_call = self.tool_calls[index]
+            if tool_call_delta.get("id"):
+                tool_call["id"] = tool_call_delta["id"]
+            if function.get("name"):
+                tool_call["function"]["name"] += function["name"]
+            arguments = function.get("arguments")
+            if isinstance(arguments, dict):
+                tool_call["function"]["arguments"] = arguments
+            elif arguments:
+                tool_call["function"]["arguments"] += arguments
+            if _arguments_complete(tool_call["function"]["arguments"]):
+                completed.extend(self._complete(index))
+        for tool_call in completed:
+            self.on_tool_call(tool_call)
+
+    def _complete(self, index: int) -> list[dict]:
+        tool_call = self.tool_calls[index]
+        if index in self._completed or not tool_call["function"]["name"] or self.on_tool_call is None:
+            return []
+        self._completed.add(index)
+        return [tool_call]
+
+    def close(self) -> dict:
+        """Complete the remaining tool calls and return the assistant message."""
+        with self._lock:
+            completed = []
+            for index in range(len(self.tool_calls)):
+                completed.extend(self._complete(index))
+        for tool_call in completed:
+            self.on_tool_call(tool_call)
+
+        tool_calls = [tool_call for tool_call in self.tool_calls if tool_call["function"]["name"]]
+        for tool_call in tool_calls:
+            if tool_call["function"]["arguments"] == "":
+                tool_call["function"]["arguments"] = "{}"
+        return {
+            "role": "assistant",
+            "content": "".join(self.content),
+            "tool_calls": tool_calls or None,
+        }
+
+
+def _arguments_complete(arguments: Any) -> bool:
+    if isinstance(arguments, dict):
+        return True
+    if not arguments.rstrip().endswith("}"):
+        return False
+    try:
+        return isinstance(json.loads(arguments), dict)
+    except ValueError:
+        return False
@@ -0,0 +1,162 @@
+"""Health checks, restart backoff and circuit breaking of MCP servers."""
+
+import asyncio
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, Callable
+
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from nbi_mcp_agent.metrics import SERVER_HEALTH_CHECK_FAILURES, SERVER_RESTARTS
+
+if TYPE_CHECKING:
+    from nbi_mcp_agent.mcp_server import Server
+
+
+logging = logging.getLogger(__name__)
+
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 60.0
+
+# JSON-RPC errors caused by the request itself; sending it again will not help.
+_NON_RETRYABLE_CODES = {
+    types.PARSE_ERROR,
+    types.INVALID_REQUEST,
+    types.METHOD_NOT_FOUND,
+    types.INVALID_PARAMS,
+}
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BACKOFF_BASE, maximum: float = DEFAULT_BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter for the given zero based attempt."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed request may succeed when sent again.
+
+    Transport failures, timeouts and server side errors are retryable;
+    invalid requests and arguments rejected by the client or server are not.
+    """
+    if isinstance(error, McpError):
+        return error.error.code not in _NON_RETRYABLE_CODES
+    return not isinstance(error, (ValueError, TypeError, KeyError))
+
+
+class CircuitBreaker:
+    """Counts consecutive failures of a server and spaces out its restarts.
+
+    After each failure the next restart is delayed by a jittered exponential
+    backoff. Once ``failure_threshold`` failures in a row are recorded the
+    breaker is open: the server's tools are not advertised and calls to it
+    fail fast until a restart or health check succeeds.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+    ) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.backoff_base: float = backoff_base
+        self.backoff_max: float = backoff_max
+        self.failures: int = 0
+        self.retry_at: float = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    @property
+    def retry_due(self) -> bool:
+        """Whether the backoff after the last failure has passed."""
+        return time.monotonic() >= self.retry_at
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self) -> None:
+        self.retry_at = time.monotonic() + backoff_delay(self.failures, self.backoff_base, self.backoff_max)
+        self.failures += 1
+
+
+class ServerSupervisor:
+    """Periodically checks the started servers and restarts failed ones.
+
+    Every ``interval`` seconds each supervised server is pinged. A server
+    whose process exited or that does not answer is stopped and restarted
+    once its :class:`CircuitBreaker` backoff has passed; ``on_restart`` is
+    then called with the server.
+    """
+
+    def __init__(
+        self,
+        servers: Callable[[], list["Server"]],
+        interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+        on_restart: Callable[["Server"], None] | None = None,
+    ) -> None:
+        self.servers = servers
+        self.interval: float = interval
+        self.on_restart = on_restart
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def set_interval(self, interval: float) -> None:
+        """Change the check interval, restarting a running check loop; 0 stops it."""
+        if interval == self.interval:
+            return
+        running = self.is_running
+        await self.stop()
+        self.interval = interval
+        if running:
+            self.start()
+
+    def start(self) -> None:
+        """Start the check loop on the running event loop, if not running yet."""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="mcp-server-supervisor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.gather(*(self.check(server) for server in self.servers() if server.supervised))
+
+    async def check(self, server: "Server") -> None:
+        """Ping one server and restart it if it is down and its backoff has passed."""
+        if server.is_alive:
+            if await server.is_responsive():
+                server.breaker.record_success()
+                return
+            logging.warning(f"Server {server.name} failed its health check, stopping it.")
+            SERVER_HEALTH_CHECK_FAILURES.inc(server=server.name)
+            await server.cleanup()
+            server.breaker.record_failure()
+
+        if not server.breaker.retry_due:
+            return
+        logging.info(f"Restarting server {server.name} after {server.breaker.failures} failures.")
+        SERVER_RESTARTS.inc(server=server.name)
+        try:
+            await server.initialize()
+        except Exception as e:
+            logging.warning(f"Restart of server {server.name} failed: {e}")
+            if server.breaker.is_open:
+                logging.warning(f"Server {server.name} is unavailable, its tools are hidden until it recovers.")
+            return
+        if self.on_restart is not None:
+            self.on_restart(server)
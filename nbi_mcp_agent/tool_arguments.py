@@ -0,0 +1,119 @@
+"""Parsing, coercion and validation of the arguments of tool calls."""
+
+import json
+import logging
+from typing import Any
+
+from fuzzy_json import loads as fuzzy_json_loads
+from jsonschema import validators
+from jsonschema.exceptions import SchemaError
+
+
+logging = logging.getLogger(__name__)
+
+
+class ArgumentValidator:
+    """Checks tool call arguments against the input schema of one tool.
+
+    Built once per tool. Top-level arguments are coerced to their declared
+    type where the model sent them as strings (``"3"``, ``"true"``, JSON
+    objects and arrays) or as whole floats, and missing optional arguments
+    with a ``default`` are filled in. The result is then validated against
+    the full schema. If the schema is invalid or cannot be evaluated, e.g.
+    because of an unresolvable ``$ref``, only required arguments are checked.
+    """
+
+    def __init__(self, input_schema: dict[str, Any]) -> None:
+        self.properties: dict[str, Any] = input_schema.get("properties") or {}
+        self.required: list[str] = list(input_schema.get("required") or [])
+        self._single_property: str | None = next(iter(self.properties)) if len(self.properties) == 1 else None
+        try:
+            validator_class = validators.validator_for(input_schema)
+            validator_class.check_schema(input_schema)
+            self._validator = validator_class(input_schema)
+        except SchemaError:
+            self._validator = None
+
+    def parse(self, raw: Any) -> Any:
+        """Decode the ``arguments`` of a tool call.
+
+        A plain string is taken as the value of a tool's only parameter.
+        """
+        if raw is None or isinstance(raw, dict):
+            return raw or {}
+        text = raw.strip()
+        if not text:
+            return {}
+        if text.startswith("{"):
+            try:
+                return json.loads(text)
+            except ValueError:
+                return fuzzy_json_loads(text)
+        if self._single_property is not None:
+            return {self._single_property: raw}
+        return raw
+
+    def validate(self, raw: Any) -> tuple[dict[str, Any], list[str]]:
+        """Return the parsed and coerced arguments and the list of problems found."""
+        try:
+            args = self.parse(raw)
+        except Exception as e:
+            return {}, [f"arguments are not valid JSON: {e}"]
+        if not isinstance(args, dict):
+            return {}, ["arguments must be a JSON object"]
+
+        args = dict(args)
+        for name, prop in self.properties.items():
+            if name in args:
+                args[name] = _coerce(args[name], prop)
+            elif isinstance(prop, dict) and "default" in prop and name not in self.required:
+                args[name] = prop["default"]
+
+        if self._validator is not None:
+            try:
+                errors = [
+                    f"{'.'.join(str(p) for p in error.absolute_path) or 'arguments'}: {error.message}"
+                    for error in self._validator.iter_errors(args)
+                ]
+                return args, errors
+            except Exception as e:
+                # E.g. a $ref that cannot be resolved: fall back to the basic check for good.
+                logging.warning(f"Input schema cannot be checked, only required arguments are: {e}")
+                self._validator = None
+        errors = [f"missing required argument '{name}'" for name in self.required if name not in args]
+        return args, errors
+
+
+def _coerce(value: Any, prop: Any) -> Any:
+    """Convert a value to the type declared by its property schema, if unambiguous."""
+    if not isinstance(prop, dict):
+        return value
+    types = prop.get("type")
+    if isinstance(types, str):
+        types = [types]
+    if not types:
+        return value
+
+    if isinstance(value, float) and "integer" in types and value.is_integer():
+        return int(value)
+    if not isinstance(value, str) or "string" in types:
+        return value
+
+    text = value.strip()
+    for type_name in types:
+        try:
+            if type_name == "integer":
+                return int(text)
+            if type_name == "number":
+                return float(text)
+            if type_name == "boolean" and text.lower() in ("true", "false"):
+                return text.lower() == "true"
+            if type_name == "null" and text.lower() in ("null", "none", ""):
+                return None
+            if type_name in ("object", "array"):
+                decoded = json.loads(text)
+                if isinstance(decoded, dict if type_name == "object" else list):
+                    return decoded
+        except ValueError:
+            continue
+    return value
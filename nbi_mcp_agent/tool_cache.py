@@ -0,0 +1,93 @@
+"""On-disk cache of the tools discovered on each MCP server."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Optional
+
+from nbi_mcp_agent.mcp_server import ToolWrapper
+
+
+logging = logging.getLogger(__name__)
+
+
+def default_cache_path() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "nbi_mcp_agent", "tool_catalog.json")
+
+
+class ToolCatalogCache:
+    """Persists the tool list of each server, keyed by a hash of its launch config.
+
+    Only the hash of ``command``, ``args`` and ``env`` (or ``url`` and
+    ``transport`` of remote servers) is stored, so changing any of them
+    invalidates the entry and secrets in ``env`` never hit the disk.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path: str = path or default_cache_path()
+        self._entries: Optional[dict[str, Any]] = None
+        self._tools: dict[str, list[ToolWrapper]] = {}
+
+    @staticmethod
+    def config_key(config: dict[str, Any]) -> str:
+        launch_config = {
+            "command": config.get("command"),
+            "args": config.get("args", []),
+            "env": config.get("env", {}),
+        }
+        if config.get("url"):
+            launch_config["url"] = config["url"]
+            launch_config["transport"] = config.get("transport")
+        encoded = json.dumps(launch_config, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _load(self) -> dict[str, Any]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable tool catalog cache {self.path}: {e}")
+                self._entries = {}
+        return self._entries
+
+    def get(self, config: dict[str, Any]) -> Optional[list[ToolWrapper]]:
+        """Return the cached tools for a server config, or None on a miss.
+
+        The same list is returned until the entry is replaced by :meth:`set`.
+        """
+        key = self.config_key(config)
+        if key not in self._tools:
+            entry = self._load().get(key)
+            if entry is None:
+                return None
+            self._tools[key] = [ToolWrapper.from_dict(tool) for tool in entry["tools"]]
+        return self._tools[key]
+
+    def set(self, name: str, config: dict[str, Any], tools: list[ToolWrapper]) -> bool:
+        """Store the tools of a server. Returns True if the cached entry changed."""
+        entries = self._load()
+        key = self.config_key(config)
+        entry = {"server": name, "tools": [tool.to_dict() for tool in tools]}
+        if entries.get(key) == entry:
+            return False
+        entries[key] = entry
+        self._tools.pop(key, None)
+        self._save(entries)
+        return True
+
+    def _save(self, entries: dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"Failed to write tool catalog cache {self.path}: {e}")
@@ -0,0 +1,107 @@
+"""Name-indexed registry of the tools advertised to the chat model."""
+
+import hashlib
+import logging
+import re
+from typing import Any, Optional
+
+from nbi_mcp_agent.mcp_server import Server, ToolWrapper
+from nbi_mcp_agent.tool_arguments import ArgumentValidator
+from nbi_mcp_agent.tool_selection import ToolIndex
+
+
+NAMESPACE_SEPARATOR = "__"
+# Function names accepted by OpenAI compatible chat completion APIs.
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_-]")
+_MAX_NAME_LENGTH = 64
+
+
+logging = logging.getLogger(__name__)
+
+
+class RegisteredTool:
+    """A tool as advertised to the model, with the server that owns it."""
+
+    __slots__ = ("name", "tool", "server", "schema", "validator")
+
+    def __init__(self, name: str, tool: ToolWrapper, server: Server) -> None:
+        self.name: str = name
+        self.tool: ToolWrapper = tool
+        self.server: Server = server
+        schema = tool.convert_tool_to_schema()
+        if name != tool.name:
+            schema = {**schema, "function": {**schema["function"], "name": name}}
+        self.schema: dict[str, Any] = schema
+        self.validator: ArgumentValidator = tool.argument_validator()
+
+
+class ToolRegistry:
+    """Maps advertised tool names to their tool, schema and owning server.
+
+    Tool names are used as is unless several servers expose the same name, in
+    which case each of them is advertised as ``<server>__<tool>``. A name
+    that is still taken, e.g. after truncation to 64 characters, gets a
+    short hash of the server and tool name as suffix.
+    """
+
+    def __init__(self, server_tools: Optional[dict[Server, list[ToolWrapper]]] = None) -> None:
+        self._tools: dict[str, RegisteredTool] = {}
+        self.schemas: list[dict[str, Any]] = []
+        self._index: Optional[ToolIndex] = None
+
+        server_tools = server_tools or {}
+        name_counts: dict[str, int] = {}
+        for tools in server_tools.values():
+            for tool in tools:
+                name_counts[tool.name] = name_counts.get(tool.name, 0) + 1
+
+        for server, tools in server_tools.items():
+            for tool in tools:
+                name = tool.name
+                if name_counts[name] > 1:
+                    name = self.namespaced_name(server.name, tool.name)
+                if name in self._tools:
+                    unique_name = self.unique_name(name, server.name, tool.name)
+                    if unique_name in self._tools or self._is_listed(server, tool.name):
+                        logging.warning(f"Server {server.name} lists tool {tool.name} more than once, ignoring it")
+                        continue
+                    logging.warning(
+                        f"Tool {tool.name} of server {server.name} is advertised as {unique_name}, "
+                        f"as {name} is taken by server {self._tools[name].server.name}"
+                    )
+                    name = unique_name
+                registered = RegisteredTool(name, tool, server)
+                self._tools[name] = registered
+                self.schemas.append(registered.schema)
+
+    @staticmethod
+    def namespaced_name(server_name: str, tool_name: str) -> str:
+        name = f"{server_name}{NAMESPACE_SEPARATOR}{tool_name}"
+        return _INVALID_NAME_CHARS.sub("_", name)[:_MAX_NAME_LENGTH]
+
+    def _is_listed(self, server: Server, tool_name: str) -> bool:
+        return any(t.server is server and t.tool.name == tool_name for t in self._tools.values())
+
+    @staticmethod
+    def unique_name(name: str, server_name: str, tool_name: str) -> str:
+        suffix = "_" + hashlib.sha1(f"{server_name}/{tool_name}".encode("utf-8")).hexdigest()[:8]
+        return name[:_MAX_NAME_LENGTH - len(suffix)] + suffix
+
+    @property
+    def index(self) -> ToolIndex:
+        """Search index of the tools, built on first use."""
+        if self._index is None:
+            self._index = ToolIndex(self)
+        return self._index
+
+    def get(self, name: str) -> Optional[RegisteredTool]:
+        return self._tools.get(name)
+
+    def names(self) -> list[str]:
+        return list(self._tools)
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
@@ -0,0 +1,162 @@
+"""Conversion of tool results to model messages, with size limits and spill-to-disk."""
+
+import logging
+import os
+import time
+import uuid
+from typing import Any, Optional
+
+from mcp.types import TextResourceContents
+
+from nbi_mcp_agent.mcp_server import ToolWrapper
+from nbi_mcp_agent.tool_cache import default_cache_path
+
+
+logging = logging.getLogger(__name__)
+
+READ_TOOL_RESULT = ToolWrapper(
+    "read_tool_result",
+    "Read part of a tool result that was too large to return in full.",
+    {
+        "properties": {
+            "handle": {"type": "string", "description": "Handle given in the truncated tool result."},
+            "offset": {"type": "integer", "description": "Character offset to start reading at."},
+            "length": {"type": "integer", "description": "Number of characters to read."},
+        },
+        "required": ["handle", "offset", "length"],
+    },
+)
+
+
+def tool_result_to_text(tool_call_response: Any) -> str:
+    """Flatten the content items of a tool call result into one string."""
+    parts = []
+    for content_item in tool_call_response.content:
+        if content_item.type == "text":
+            parts.append(content_item.text)
+        elif content_item.type == "image":
+            parts.append(f"[Image: {content_item.mimeType}]")
+        elif content_item.type == "resource":
+            if isinstance(content_item.resource, TextResourceContents):
+                parts.append(content_item.resource.text)
+            else:
+                parts.append(f"[Binary Resource: {content_item.resource.mimeType}]")
+    return "".join(parts)
+
+
+def tool_result_size(tool_call_response: Any) -> int:
+    """Size of the content items of a tool call result in characters, without serializing it."""
+    size = 0
+    for content_item in tool_call_response.content:
+        if content_item.type == "text":
+            size += len(content_item.text)
+        elif content_item.type == "image":
+            size += len(content_item.data)
+        elif content_item.type == "resource":
+            if isinstance(content_item.resource, TextResourceContents):
+                size += len(content_item.resource.text)
+            else:
+                size += len(content_item.resource.blob)
+    return size
+
+
+def default_store_dir() -> str:
+    return os.path.join(os.path.dirname(default_cache_path()), "tool_results")
+
+
+class ToolResultStore:
+    """Local files holding tool results that were too large to send to the model.
+
+    Each result is stored under a random handle that the model can page
+    through with the built-in ``read_tool_result`` tool. Files older than
+    ``max_age`` seconds are removed when the store is created.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_age: float = 24 * 60 * 60) -> None:
+        self.directory: str = directory or default_store_dir()
+        self._prune(max_age)
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.directory, f"{handle}.txt")
+
+    def _prune(self, max_age: float) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        cutoff = time.time() - max_age
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError as e:
+                logging.warning(f"Failed to remove stale tool result {entry.path}: {e}")
+
+    def save(self, text: str) -> Optional[str]:
+        """Store a result and return its handle, or None if it could not be written."""
+        handle = uuid.uuid4().hex
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(handle), "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            logging.warning(f"Failed to store tool result: {e}")
+            return None
+        return handle
+
+    def read(self, handle: str, offset: int, length: int) -> str:
+        """Read ``length`` characters of a stored result starting at ``offset``."""
+        if not handle.isalnum():
+            raise ValueError(f"Invalid tool result handle: {handle}")
+        with open(self._path(handle), "r", encoding="utf-8") as f:
+            remaining = max(offset, 0)
+            while remaining > 0:
+                skipped = f.read(min(remaining, 1024 * 1024))
+                if not skipped:
+                    break
+                remaining -= len(skipped)
+            return f.read(max(length, 0))
+
+
+class ToolResultLimiter:
+    """Applies the per-result and per-conversation size limits of one chat request.
+
+    A result longer than what is left of the budget is stored in the
+    :class:`ToolResultStore` and replaced by a preview that tells the model
+    how to read the rest.
+    """
+
+    # Smallest preview kept when the conversation budget is used up.
+    MIN_PREVIEW_CHARS = 1000
+
+    def __init__(self, store: ToolResultStore, max_result_chars: int, max_total_chars: int) -> None:
+        self.store = store
+        self.max_result_chars = max_result_chars
+        self.max_total_chars = max_total_chars
+        self.total_chars: int = 0
+        self.spilled: bool = False
+
+    def limit(self, text: str) -> str:
+        remaining = max(self.max_total_chars - self.total_chars, self.MIN_PREVIEW_CHARS)
+        allowed = min(self.max_result_chars, remaining)
+        if len(text) > allowed:
+            handle = self.store.save(text)
+            preview = text[:allowed]
+            if handle is None:
+                text = f"{preview}\n[Output truncated: showing {allowed} of {len(text)} characters.]"
+            else:
+                self.spilled = True
+                text = (
+                    f"{preview}\n[Output truncated: showing {allowed} of {len(text)} characters. "
+                    f"Call {READ_TOOL_RESULT.name} with handle \"{handle}\", an offset and a length to read more.]"
+                )
+        self.total_chars += len(text)
+        return text
+
+    def read(self, args: dict[str, Any]) -> str:
+        """Run the built-in ``read_tool_result`` tool."""
+        length = min(int(args.get("length", self.max_result_chars)), self.max_result_chars)
+        try:
+            text = self.store.read(str(args["handle"]), int(args.get("offset", 0)), length)
+        except (OSError, ValueError) as e:
+            text = f"Error reading tool result: {e}"
+        self.total_chars += len(text)
+        return text
@@ -0,0 +1,152 @@
+"""Relevance ranking of tools against the conversation, to ship fewer tools per completion."""
+
+import heapq
+import math
+import re
+import threading
+from typing import TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:
+    from nbi_mcp_agent.tool_registry import ToolRegistry
+
+
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase words, breaking up snake_case and camelCase names."""
+    return [word.lower() for word in _WORD.findall(text or "")]
+
+
+class ToolIndex:
+    """BM25 index over the names, descriptions and parameter names of the tools in a registry."""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, registry: "ToolRegistry") -> None:
+        self._names: list[str] = registry.names()
+        self._doc_lengths: list[int] = []
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+
+        for doc_id, name in enumerate(self._names):
+            tool = registry.get(name).tool
+            # The name is counted twice as it is the strongest signal.
+            tokens = tokenize(name) * 2 + tokenize(tool.description)
+            for parameter in tool.input_schema.get("properties", {}):
+                tokens.extend(tokenize(parameter))
+            self._doc_lengths.append(len(tokens))
+            counts: dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                self._postings.setdefault(token, []).append((doc_id, count))
+
+        doc_count = len(self._names)
+        self._avg_doc_length = sum(self._doc_lengths) / doc_count if doc_count else 0.0
+        self._idf = {
+            token: math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for token, postings in self._postings.items()
+        }
+
+    def search(self, text: str, limit: int) -> list[str]:
+        """Return the names of up to ``limit`` tools matching the text, best first."""
+        scores: dict[int, float] = {}
+        for token in set(tokenize(text)):
+            idf = self._idf.get(token)
+            if idf is None:
+                continue
+            for doc_id, count in self._postings[token]:
+                length_norm = 1 - self.B + self.B * self._doc_lengths[doc_id] / self._avg_doc_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * count * (self.K1 + 1) / (count + self.K1 * length_norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self._names[doc_id] for doc_id, _ in best]
+
+
+class ToolSelectionStats:
+    """Counts how often the model called a tool that was in the shipped selection."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.pruned_rounds: int = 0
+        self.full_rounds: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def record_round(self, pruned: bool) -> None:
+        with self._lock:
+            if pruned:
+                self.pruned_rounds += 1
+            else:
+                self.full_rounds += 1
+
+    def record_call(self, selected: bool) -> None:
+        with self._lock:
+            if selected:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 1.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pruned_rounds": self.pruned_rounds,
+            "full_rounds": self.full_rounds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class ToolSelector:
+    """Chooses the tools shipped with each completion of one chat request.
+
+    When the registry has at least ``tool_selection_min_tools`` tools, only
+    the ``tool_selection_top_k`` tools ranking best against the recent user
+    messages are sent, plus every tool already called in the conversation.
+    If nothing matches, or selection is disabled, all tools are sent.
+    """
+
+    # Number of recent user messages the query is built from.
+    QUERY_MESSAGES = 3
+
+    def __init__(self, registry: "ToolRegistry", settings: dict[str, Any], messages: list[dict], stats: ToolSelectionStats) -> None:
+        self.registry = registry
+        self.stats = stats
+        self.selected: set[str] | None = None
+        self.used: set[str] = set()
+
+        top_k = settings["tool_selection_top_k"]
+        if top_k <= 0 or len(registry) < settings["tool_selection_min_tools"]:
+            return
+        user_messages = [m for m in messages if m.get("role") == "user"][-self.QUERY_MESSAGES:]
+        query = " ".join(str(m.get("content", "")) for m in user_messages)
+        matches = registry.index.search(query, top_k)
+        if matches:
+            self.selected = set(matches)
+            self.add_used(messages)
+
+    def add_used(self, messages: Iterable[dict]) -> None:
+        """Keep the tools called in these messages in the selection."""
+        for message in messages:
+            for tool_call in message.get("tool_calls") or []:
+                name = tool_call.get("function", {}).get("name")
+                if name in self.registry:
+                    self.used.add(name)
+
+    def schemas(self) -> list[dict]:
+        """Return the schemas to send with the next completion, in registry order."""
+        if self.selected is None:
+            self.stats.record_round(pruned=False)
+            return self.registry.schemas
+        self.stats.record_round(pruned=True)
+        keep = self.selected | self.used
+        return [schema for schema in self.registry.schemas if schema["function"]["name"] in keep]
+
+    def record_call(self, name: str) -> None:
+        if self.selected is not None:
+            self.stats.record_call(name in self.selected or name in self.used)